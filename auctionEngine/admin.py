@@ -1,7 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Auction, Bid
+from .models import User, Auction, Bid, AuctionEvent, OutboxMessage, Watch, Notification, ExchangeRate, SavedSearch, SuspiciousBidder
 
 admin.site.register(User, UserAdmin)
 admin.site.register(Auction)
-admin.site.register(Bid)
\ No newline at end of file
+admin.site.register(Bid)
+admin.site.register(AuctionEvent)
+admin.site.register(OutboxMessage)
+admin.site.register(Watch)
+admin.site.register(Notification)
+admin.site.register(ExchangeRate)
+admin.site.register(SavedSearch)
+admin.site.register(SuspiciousBidder)
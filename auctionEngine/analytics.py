@@ -0,0 +1,95 @@
+import numpy as np
+from django.core.cache import cache
+
+from .models import Bid
+
+CHUNK_SIZE = 10000
+CURVE_POINTS = 100  # price curve is downsampled to at most this many points
+REPORT_TIMEOUT = 60 * 60 * 24  # seconds; a new bid changes the auction version and so the key
+
+
+def load_bid_columns(auction_id, chunk_size=CHUNK_SIZE):
+    """
+    Reads (created_at, amount, user_id) for every bid on the auction, in time
+    order, into three NumPy arrays. Rows are fetched as tuples in chunks and
+    never become model instances.
+    """
+    rows = (
+        Bid.objects.filter(auction_id=auction_id)
+        .order_by('created_at')
+        .values_list('created_at', 'amount', 'user_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    times, amounts, users = [], [], []
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            _append_chunk(chunk, times, amounts, users)
+            chunk = []
+    if chunk:
+        _append_chunk(chunk, times, amounts, users)
+
+    if not times:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    return np.concatenate(times), np.concatenate(amounts), np.concatenate(users)
+
+
+def _append_chunk(chunk, times, amounts, users):
+    created_at, amount, user_id = zip(*chunk)
+    times.append(np.fromiter((moment.timestamp() for moment in created_at), dtype=np.float64, count=len(chunk)))
+    amounts.append(np.array(amount, dtype=np.float64))
+    users.append(np.array(user_id, dtype=np.int64))
+
+
+def compute_report(times, amounts, users):
+    """Price curve, bid velocity and bidder concentration from column arrays"""
+    count = len(times)
+    if count == 0:
+        return {'bid_count': 0, 'bidder_count': 0, 'price_curve': [], 'velocity': {}, 'increments': {}, 'concentration': {}}
+
+    # Price curve, downsampled evenly over the bids
+    points = np.unique(np.linspace(0, count - 1, min(count, CURVE_POINTS)).astype(np.int64))
+    price_curve = [{'time': float(times[i]), 'amount': round(float(amounts[i]), 2)} for i in points]
+
+    # Bid velocity
+    duration = float(times[-1] - times[0])
+    per_minute = np.bincount(((times - times[0]) // 60).astype(np.int64))
+    gaps = np.diff(times)
+
+    # Price increments between consecutive bids
+    steps = np.diff(amounts)
+
+    # Bidder concentration
+    _, bids_per_user = np.unique(users, return_counts=True)
+    shares = bids_per_user / count
+
+    return {
+        'bid_count': count,
+        'bidder_count': len(bids_per_user),
+        'price_curve': price_curve,
+        'velocity': {
+            'bids_per_hour': round(count / duration * 3600, 2) if duration else None,
+            'peak_bids_per_minute': int(per_minute.max()),
+            'median_seconds_between_bids': round(float(np.median(gaps)), 2) if len(gaps) else None,
+        },
+        'increments': {
+            'mean': round(float(steps.mean()), 2) if len(steps) else None,
+            'median': round(float(np.median(steps)), 2) if len(steps) else None,
+            'max': round(float(steps.max()), 2) if len(steps) else None,
+        },
+        'concentration': {
+            'top_bidder_share': round(float(shares.max()), 4),
+            'herfindahl_index': round(float(np.square(shares).sum()), 4),
+        },
+    }
+
+
+def auction_report(auction):
+    """Report for the auction, cached until its next bid changes its version"""
+    key = f'auction-report:{auction.pk}:{auction.version}'
+    report = cache.get(key)
+    if report is None:
+        report = compute_report(*load_bid_columns(auction.pk))
+        cache.set(key, report, REPORT_TIMEOUT)
+    return report
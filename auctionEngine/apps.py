@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AuctionengineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auctionEngine'
+
+    def ready(self):
+        # Connects the task latency signal handlers in web, worker and beat processes
+        from . import queues  # noqa: F401
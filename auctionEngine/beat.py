@@ -0,0 +1,98 @@
+import copy
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from celery.beat import PersistentScheduler
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Now
+
+from .models import BeatFence
+
+logger = logging.getLogger(__name__)
+
+LEADER_FENCE = 'beat-leader'
+FENCING_KWARG = 'fencing_token'
+
+
+class LeaderLease:
+    """
+    Leadership among beat replicas, held as the BeatFence row LEADER_FENCE and
+    expiring BEAT_LEADER_TTL seconds after the leader last renewed it. Taking
+    the lease increments the row's token in the same UPDATE, so tokens are
+    durable, only grow, and a replica that lost the lease without noticing is
+    always behind. Expiry is judged by the database clock, not the replicas'.
+    """
+
+    def __init__(self, ttl=None, node=None):
+        self.ttl = ttl or settings.BEAT_LEADER_TTL
+        self.node = node or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.token = None
+
+    @property
+    def renew_interval(self):
+        """How often the leader renews, several times per TTL so one slow tick doesn't lose the lease"""
+        return self.ttl / 3
+
+    def hold(self):
+        """Acquires or renews the lease and returns whether this replica leads"""
+        lease = BeatFence.objects.filter(name=LEADER_FENCE)
+        expires_at = Now() + timedelta(seconds=self.ttl)
+        if self.token is not None:
+            # Extends the lease only while this replica still holds it, in one statement
+            if lease.filter(holder=self.node, token=self.token, expires_at__gt=Now()).update(expires_at=expires_at):
+                return True
+            logger.warning('Beat %s lost leadership at token %s', self.node, self.token)
+            self.token = None
+        BeatFence.objects.get_or_create(name=LEADER_FENCE)
+        with transaction.atomic():
+            # Of standbys racing for an expired lease, the UPDATE that waits on
+            # the row lock finds it renewed and takes nothing
+            taken = lease.filter(Q(expires_at__isnull=True) | Q(expires_at__lte=Now())).update(
+                holder=self.node, expires_at=expires_at, token=F('token') + 1,
+            )
+            if not taken:
+                return False
+            self.token = lease.values_list('token', flat=True).get()
+        logger.info('Beat %s leads with fencing token %s', self.node, self.token)
+        return True
+
+    def release(self):
+        # Lets a standby take over on its next tick instead of after the TTL
+        if self.token is not None:
+            BeatFence.objects.filter(name=LEADER_FENCE, holder=self.node, token=self.token).update(holder='', expires_at=None)
+        self.token = None
+
+
+class LeaderScheduler(PersistentScheduler):
+    """
+    A beat scheduler for running several beat replicas: only the replica
+    holding the lease sends tasks, and standbys poll for it every
+    renew_interval seconds. Tasks in BEAT_FENCED_TASKS get the leader's
+    fencing token as a `fencing_token` argument to check against BeatFence.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lease = LeaderLease()
+        super().__init__(*args, **kwargs)
+
+    def tick(self, *args, **kwargs):
+        if not self.lease.hold():
+            return self.lease.renew_interval
+        return min(super().tick(*args, **kwargs), self.lease.renew_interval)
+
+    def apply_async(self, entry, producer=None, advance=True, **kwargs):
+        entry = self.reserve(entry) if advance else entry
+        if entry.task in settings.BEAT_FENCED_TASKS:
+            # Sent from a copy, so the token never ends up in the stored schedule
+            entry = copy.copy(entry)
+            entry.kwargs = {**(entry.kwargs or {}), FENCING_KWARG: self.lease.token}
+        return super().apply_async(entry, producer=producer, advance=False, **kwargs)
+
+    def close(self):
+        super().close()
+        self.lease.release()
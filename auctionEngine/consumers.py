@@ -0,0 +1,49 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authtoken.models import Token
+
+from .notifications import user_group
+
+
+@database_sync_to_async
+def token_user(key):
+    token = Token.objects.select_related('user').filter(key=key).first()
+    return token.user if token and token.user.is_active else AnonymousUser()
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Signs websockets in with an API token passed as `?token=<key>`, for clients
+    that authenticate with tokens rather than a session. Without a token the
+    session user is kept.
+    """
+
+    async def __call__(self, scope, receive, send):
+        keys = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if keys:
+            scope = dict(scope, user=await token_user(keys[-1]))
+        return await super().__call__(scope, receive, send)
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes a signed-in user's notifications over a websocket"""
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = user_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notify(self, event):
+        await self.send_json(event['notification'])
@@ -0,0 +1,77 @@
+import json
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+
+from .models import Auction, ExchangeRate
+from .versions import bump_list_version
+
+RATES_CACHE_KEY = 'exchange-rates'
+CENT = Decimal('0.01')
+
+
+def exchange_rates():
+    """{currency: units per one BASE_CURRENCY}, read from the rate table once per cache lifetime"""
+    rates = cache.get(RATES_CACHE_KEY)
+    if rates is None:
+        rates = {currency: str(rate) for currency, rate in ExchangeRate.objects.values_list('currency', 'rate')}
+        rates[settings.BASE_CURRENCY] = '1'
+        cache.set(RATES_CACHE_KEY, rates, None)
+    return {currency: Decimal(rate) for currency, rate in rates.items()}
+
+
+def convert(amount, from_currency, to_currency, rates=None):
+    """`amount` in `to_currency`, or None when either rate is unknown"""
+    if amount is None:
+        return None
+    if from_currency == to_currency:
+        return amount
+    rates = rates if rates is not None else exchange_rates()
+    if from_currency not in rates or to_currency not in rates:
+        return None
+    return (amount / rates[from_currency] * rates[to_currency]).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def to_base(amount, currency, rates=None):
+    return convert(amount, currency, settings.BASE_CURRENCY, rates)
+
+
+def fetch_rates():
+    """Latest rates per BASE_CURRENCY from EXCHANGE_RATES_URL, limited to CURRENCIES"""
+    import urllib.request  # Only the rate refresh task makes HTTP calls
+    url = settings.EXCHANGE_RATES_URL.format(base=settings.BASE_CURRENCY)
+    with urllib.request.urlopen(url, timeout=10) as response:
+        published = json.load(response)['rates']
+    return {
+        currency: Decimal(str(published[currency]))
+        for currency in settings.CURRENCIES
+        if currency != settings.BASE_CURRENCY and currency in published
+    }
+
+
+def store_rates(rates):
+    """
+    Saves new rates and renormalizes the prices of auctions in every currency
+    whose rate moved, one UPDATE per currency, so price filters and sorting
+    keep reading a plain indexed column.
+    """
+    current = exchange_rates()
+    changed = {currency: rate for currency, rate in rates.items() if current.get(currency) != rate}
+    if not changed:
+        return 0
+    with transaction.atomic():
+        for currency, rate in changed.items():
+            ExchangeRate.objects.update_or_create(currency=currency, defaults={'rate': rate})
+            # The version moves with the price, so detail ETags change too
+            Auction.objects.filter(currency=currency).update(
+                normalized_price=ExpressionWrapper(
+                    F('current_price') / Value(rate), output_field=DecimalField(max_digits=14, decimal_places=2),
+                ),
+                version=F('version') + 1,
+            )
+        transaction.on_commit(lambda: cache.delete(RATES_CACHE_KEY))
+        transaction.on_commit(bump_list_version)
+    return len(changed)
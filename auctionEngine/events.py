@@ -0,0 +1,129 @@
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+
+from .currency import exchange_rates, to_base
+from .models import Auction, AuctionEvent
+from .versions import bump_list_version
+
+EVENT_FIELDS = ('id', 'auction_id', 'kind', 'user_id', 'amount', 'end_time', 'reason', 'created_at')
+
+
+@dataclass
+class AuctionState:
+    """An auction's state as rebuilt from its events"""
+    auction_id: int
+    starting_price: Decimal = None
+    current_price: Decimal = None
+    end_time: object = None
+    is_active: bool = True
+    highest_bidder_id: int = None
+    last_event_id: int = 0
+
+    def apply(self, event):
+        kind = event['kind']
+        if kind == AuctionEvent.OPENED:
+            self.starting_price = self.current_price = event['amount']
+            self.end_time = event['end_time']
+        elif kind == AuctionEvent.BID_ACCEPTED:
+            self.current_price = event['amount']
+            self.highest_bidder_id = event['user_id']
+        elif kind == AuctionEvent.EXTENDED:
+            self.end_time = event['end_time']
+        elif kind == AuctionEvent.CLOSED:
+            self.is_active = False
+            if event['amount'] is not None:
+                self.current_price = event['amount']
+            if event['user_id'] is not None:
+                self.highest_bidder_id = event['user_id']
+        self.last_event_id = event['id']
+
+
+def iter_events(auction_ids=None, after=0, until=None, chunk_size=2000):
+    """Streams events as plain dicts in log order, without building model instances"""
+    events = AuctionEvent.objects.filter(id__gt=after)
+    if auction_ids:
+        events = events.filter(auction_id__in=auction_ids)
+    if until:
+        events = events.filter(created_at__lte=until)
+    return events.order_by('id').values(*EVENT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def events_after(cursor, limit=500):
+    """
+    Returns the next batch of events after `cursor` (an event id). Consumers keep
+    the id of the last event they handled and read the log from there.
+    """
+    return list(AuctionEvent.objects.filter(id__gt=cursor).order_by('id').values(*EVENT_FIELDS)[:limit])
+
+
+def replay(events, until=None):
+    """Folds events into one AuctionState per auction"""
+    states = {}
+    for event in events:
+        if until and event['created_at'] > until:
+            continue
+        auction_id = event['auction_id']
+        if auction_id not in states:
+            states[auction_id] = AuctionState(auction_id)
+        states[auction_id].apply(event)
+    return states
+
+
+def rebuild_auctions(states, batch_size=1000):
+    """
+    Writes replayed states back to the Auction table in bulk, with their base
+    currency prices, and bumps each auction's version and the list version so
+    cached pages and ETags don't keep serving the old state
+    """
+    rates = exchange_rates()
+    replayed = [state for state in states.values() if state.starting_price is not None]
+    count = 0
+    for start in range(0, len(replayed), batch_size):
+        batch = replayed[start:start + batch_size]
+        currencies = dict(Auction.objects.filter(id__in=[state.auction_id for state in batch]).values_list('id', 'currency'))
+        auctions = [
+            Auction(
+                id=state.auction_id,
+                current_price=state.current_price,
+                normalized_price=to_base(state.current_price, currencies[state.auction_id], rates),
+                end_time=state.end_time,
+                is_active=state.is_active,
+                version=F('version') + 1,
+            )
+            for state in batch
+            if state.auction_id in currencies
+        ]
+        Auction.objects.bulk_update(auctions, ['current_price', 'normalized_price', 'end_time', 'is_active', 'version'])
+        count += len(auctions)
+    if count:
+        transaction.on_commit(bump_list_version)
+    return count
+
+
+def write_segment(events, fp):
+    """Writes events to `fp` as NDJSON, one event per line. Returns the number written"""
+    count = 0
+    for event in events:
+        fp.write(json.dumps(event, default=str, separators=(',', ':')))
+        fp.write('\n')
+        count += 1
+    return count
+
+
+def read_segment(fp):
+    """Reads events back from an NDJSON segment"""
+    for line in fp:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if event['amount'] is not None:
+            event['amount'] = Decimal(event['amount'])
+        for field in ('end_time', 'created_at'):
+            if event[field] is not None:
+                event[field] = parse_datetime(event[field])
+        yield event
@@ -1,11 +1,39 @@
 import django_filters
+from django.conf import settings
+from rest_framework import filters
 from .models import Auction
+from .currency import to_base
+
+CURRENCY_CHOICES = [(currency, currency) for currency in settings.CURRENCIES]
 
 class AuctionFilter(django_filters.FilterSet):
-    min_price = django_filters.NumberFilter(field_name='current_price', lookup_expr='gte')
-    max_price = django_filters.NumberFilter(field_name='current_price', lookup_expr='lte')
+    # Bounds are in `currency` and converted once, so the query compares the indexed normalized_price
+    min_price = django_filters.NumberFilter(method='filter_price', label='Minimum price')
+    max_price = django_filters.NumberFilter(method='filter_price', label='Maximum price')
+    currency = django_filters.ChoiceFilter(choices=CURRENCY_CHOICES, method='filter_currency')
     name = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
 
     class Meta:
         model = Auction
-        fields = ['name', 'min_price', 'max_price']
\ No newline at end of file
+        fields = ['name', 'min_price', 'max_price', 'currency']
+
+    def filter_price(self, queryset, name, value):
+        currency = self.form.cleaned_data.get('currency') or settings.BASE_CURRENCY
+        bound = to_base(value, currency)
+        if bound is None:
+            return queryset.none()
+        lookup = 'gte' if name == 'min_price' else 'lte'
+        return queryset.filter(**{f'normalized_price__{lookup}': bound})
+
+    def filter_currency(self, queryset, name, value):
+        # Only sets the unit of the price bounds and display prices
+        return queryset
+
+class AuctionOrderingFilter(filters.OrderingFilter):
+    """Sorting by current_price compares prices converted to the base currency"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [term.replace('current_price', 'normalized_price') for term in ordering]
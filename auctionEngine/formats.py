@@ -0,0 +1,121 @@
+from decimal import ROUND_CEILING, Decimal
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Auction, AuctionEvent
+from .notifications import schedule_outbid
+
+
+class EnglishAuction:
+    """Open ascending auction: every bid must beat the current price"""
+    locks_auction = True  # Bids read and write the price, so they serialize on the auction row
+    hides_bids = False
+
+    def live_price(self, auction):
+        return auction.current_price
+
+    def validate_bid(self, auction, amount):
+        """Returns an error message, or None if the bid can be placed"""
+        if amount <= auction.current_price:
+            return f'Bid must be higher than current price (${auction.current_price})'
+
+    def clearing_amount(self, auction, amount):
+        """The amount the bid is recorded at"""
+        return amount
+
+    def record_bid(self, auction, bid):
+        auction.current_price = bid.amount
+        auction.save()
+        AuctionEvent.record(auction, AuctionEvent.BID_ACCEPTED, user=bid.user, amount=bid.amount)
+        schedule_outbid(auction)
+
+    def resolve(self, auction):
+        """Returns (winner id, final price) when the auction closes"""
+        top = auction.bids.order_by('-amount', 'created_at', 'id').values_list('user_id', flat=True).first()
+        return top, auction.current_price
+
+
+class SealedFirstPriceAuction(EnglishAuction):
+    """Hidden bids, highest bidder wins and pays their own bid"""
+    locks_auction = False  # Bids are plain appends that never touch the auction row
+    hides_bids = True
+
+    def validate_bid(self, auction, amount):
+        if amount < auction.starting_price:
+            return f'Bid must be at least the starting price (${auction.starting_price})'
+
+    def record_bid(self, auction, bid):
+        AuctionEvent.record(auction, AuctionEvent.SEALED_BID, user=bid.user, amount=bid.amount)
+
+    def resolve(self, auction):
+        # The top bids of the two highest bidders are enough for every sealed
+        # format; of equal bids, the one placed first wins. A bidder may bid
+        # more than once, so the runner-up is the best bid by anyone else.
+        top = auction.bids.order_by('-amount', 'created_at', 'id').values_list('user_id', 'amount').first()
+        if top is None:
+            return None, auction.starting_price
+        winner, amount = top
+        runner_up = auction.bids.exclude(user_id=winner).aggregate(amount=Max('amount'))['amount']
+        amounts = [amount] if runner_up is None else [amount, runner_up]
+        return winner, self.clearing_price(auction, amounts)
+
+    def clearing_price(self, auction, amounts):
+        return amounts[0]
+
+
+class VickreyAuction(SealedFirstPriceAuction):
+    """Hidden bids, highest bidder wins and pays the second-highest bid"""
+
+    def clearing_price(self, auction, amounts):
+        return amounts[1] if len(amounts) > 1 else auction.starting_price
+
+
+class DutchAuction(EnglishAuction):
+    """
+    Descending auction: the price falls linearly from the starting price to the
+    reserve price over the auction's lifetime, and the first bid at or above
+    it wins. The price is computed when read, never written on a timer, and
+    steps once per DUTCH_PRICE_TICK so it can be cached within a tick.
+    """
+
+    def live_price(self, auction):
+        if not auction.is_active or auction.reserve_price is None:
+            return auction.current_price
+        duration = (auction.end_time - auction.created_at).total_seconds()
+        elapsed = price_tick() * settings.DUTCH_PRICE_TICK - auction.created_at.timestamp()
+        progress = min(max(elapsed / duration, 0), 1) if duration > 0 else 1
+        price = auction.starting_price - (auction.starting_price - auction.reserve_price) * Decimal(progress)
+        return price.quantize(Decimal('0.01'), rounding=ROUND_CEILING)
+
+    def validate_bid(self, auction, amount):
+        price = self.live_price(auction)
+        if amount < price:
+            return f'Bid must be at least the current price (${price})'
+
+    def clearing_amount(self, auction, amount):
+        return self.live_price(auction)
+
+    def record_bid(self, auction, bid):
+        super().record_bid(auction, bid)
+        auction.close()
+
+
+FORMATS = {
+    Auction.ENGLISH: EnglishAuction(),
+    Auction.SEALED_FIRST_PRICE: SealedFirstPriceAuction(),
+    Auction.VICKREY: VickreyAuction(),
+    Auction.DUTCH: DutchAuction(),
+}
+
+SEALED_FORMATS = [name for name, auction_format in FORMATS.items() if auction_format.hides_bids]
+
+
+def price_tick():
+    """Index of the current Dutch price step, part of cache keys for live prices"""
+    return int(timezone.now().timestamp() // settings.DUTCH_PRICE_TICK)
+
+
+def get_format(name):
+    return FORMATS[name]
@@ -0,0 +1,167 @@
+import math
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from itertools import takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .events import events_after
+from .models import Auction, AuctionEvent
+
+CURSOR_KEY = 'fraud:cursor'
+BID_KINDS = (AuctionEvent.BID_ACCEPTED, AuctionEvent.SEALED_BID)
+
+SMOOTHING = 0.2  # weight of the newest bid in every moving average
+BURST_WINDOW = 60  # seconds over which the decayed bid count is taken
+BURST_BIDS = 10  # decayed bids per BURST_WINDOW no person places by hand
+MIN_BIDS = 5  # bids seen from a user before any score counts
+TINY_INCREMENT = Decimal('0.005')  # rise over the previous price, as a fraction, that only probes the price
+SMALL_INCREMENT = Decimal('0.02')
+WEIGHTS = {'cadence': 0.35, 'increment': 0.25, 'seller': 0.4}
+
+
+@dataclass
+class BidSignal:
+    """One committed bid, as the scorer sees it"""
+    event_id: int
+    auction_id: int
+    user_id: int
+    seller_id: int
+    amount: Decimal
+    starting_price: Decimal
+    at: float  # epoch seconds the bid was committed
+
+
+class BidScorer:
+    """
+    Scores bids one at a time against bounded, per-key state in the cache:
+    moving averages per bidder, the last price per auction and one counter per
+    (seller, bidder) pair. Each bid reads and writes a fixed number of keys, and
+    every key expires FRAUD_STATE_TTL after its last bid, so memory is bounded
+    by recent activity. Time comes from the bids themselves, so replaying a
+    stream scores it exactly as it was scored live.
+
+    State is read and written without locks; run one scorer per stream.
+    """
+
+    def __init__(self, store=None, timeout=None):
+        self.store = store if store is not None else cache
+        self.timeout = timeout if timeout is not None else settings.FRAUD_STATE_TTL
+
+    def score(self, bid):
+        """(score between 0 and 1, reasons) for `bid`, after folding it into the state"""
+        user_key, auction_key = f'fraud:user:{bid.user_id}', f'fraud:auction:{bid.auction_id}'
+        pair_key = f'fraud:pair:{bid.seller_id}:{bid.user_id}'
+        state = self.store.get_many([user_key, auction_key, pair_key])
+        user = state.get(user_key) or {'bids': 0, 'at': None, 'gap': None, 'spread': 0.0, 'burst': 0.0, 'increment': None}
+        previous = Decimal(state.get(auction_key) or bid.starting_price)
+        pair = state.get(pair_key, 0) + 1
+
+        if user['at'] is not None:
+            gap = max(bid.at - user['at'], 0.0)
+            if user['gap'] is None:
+                user['gap'] = gap
+            else:
+                user['spread'] = _average(user['spread'], abs(gap - user['gap']))
+                user['gap'] = _average(user['gap'], gap)
+            user['burst'] *= math.exp(-gap / BURST_WINDOW)
+        user['burst'] += 1
+        if previous > 0:
+            rise = float(max(bid.amount - previous, 0) / previous)
+            user['increment'] = rise if user['increment'] is None else _average(user['increment'], rise)
+        user['bids'] += 1
+        user['at'] = bid.at
+
+        self.store.set_many({user_key: user, auction_key: str(max(bid.amount, previous)), pair_key: pair}, self.timeout)
+        return _score(user, pair)
+
+
+def _average(average, value):
+    return (1 - SMOOTHING) * average + SMOOTHING * value
+
+
+def _score(user, pair):
+    if user['bids'] < MIN_BIDS:
+        return 0.0, []
+    signals = {}
+    # Bots bid in bursts, or at a steady beat a person never keeps
+    regularity = 1 - min(user['spread'] / user['gap'], 1) if user['gap'] else 1.0
+    signals['cadence'] = max(regularity, min(user['burst'] / BURST_BIDS, 1))
+    # Shill bidders nudge the price up by the smallest step that counts
+    increment = Decimal(str(user['increment'] or 0))
+    signals['increment'] = float(min(max((SMALL_INCREMENT - increment) / (SMALL_INCREMENT - TINY_INCREMENT), 0), 1))
+    # ...and bid on one seller's auctions far more than anyone else's
+    signals['seller'] = min(pair / user['bids'], 1)
+    score = round(sum(WEIGHTS[name] * value for name, value in signals.items()), 3)
+    return score, sorted(name for name, value in signals.items() if value >= 0.5)
+
+
+def bid_signals(events):
+    """BidSignals for the bid events in a batch, with one query for their auctions"""
+    bids = [event for event in events if event['kind'] in BID_KINDS and event['user_id'] is not None]
+    auctions = {
+        auction['id']: auction
+        for auction in Auction.objects.filter(id__in={bid['auction_id'] for bid in bids}).values('id', 'creator_id', 'starting_price')
+    }
+    return [
+        BidSignal(
+            event_id=bid['id'],
+            auction_id=bid['auction_id'],
+            user_id=bid['user_id'],
+            seller_id=auctions[bid['auction_id']]['creator_id'],
+            amount=bid['amount'],
+            starting_price=auctions[bid['auction_id']]['starting_price'],
+            at=bid['created_at'].timestamp(),
+        )
+        for bid in bids
+        if bid['auction_id'] in auctions
+    ]
+
+
+def scan(signals, scorer=None):
+    """
+    Scores a stream of BidSignals and returns [user id, auction id, score,
+    reasons] for each bid at or above FRAUD_SCORE_THRESHOLD. Live bids and
+    replayed synthetic streams both go through here.
+    """
+    scorer = scorer or BidScorer()
+    suspicious = []
+    for bid in signals:
+        score, reasons = scorer.score(bid)
+        if score >= settings.FRAUD_SCORE_THRESHOLD:
+            suspicious.append([bid.user_id, bid.auction_id, score, reasons])
+    return suspicious
+
+
+def process_new_bids(batch_size=500):
+    """
+    Scores the bids committed since the last run, reading the event log from a
+    cursor kept in the cache, and queues a flag for each suspicious bidder. Runs
+    off the bid path, so placing a bid never waits on scoring. Returns how many
+    events were taken.
+    """
+    from .tasks import flag_suspicious_bidder
+    cursor = cache.get(CURSOR_KEY)
+    if cursor is None:
+        # No cursor (first run, or the cache was flushed): start at the head of
+        # the log rather than rescoring its whole history
+        cursor = AuctionEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        cache.set(CURSOR_KEY, cursor, None)
+        return 0
+    # Bid transactions commit out of id order, so an event can appear below
+    # the cursor after it has moved on. Only events older than
+    # FRAUD_COMMIT_LAG are taken; anything that commits within the lag is
+    # still ahead of the cursor when the cursor gets to it.
+    settled = timezone.now() - timedelta(seconds=settings.FRAUD_COMMIT_LAG)
+    events = list(takewhile(lambda event: event['created_at'] <= settled, events_after(cursor, batch_size)))
+    if not events:
+        return 0
+    for user_id, auction_id, score, reasons in scan(bid_signals(events)):
+        # A bot scores high on every bid; queue one flag per cooldown, not one per bid
+        if cache.add(f'fraud:flagged:{user_id}', 1, settings.FRAUD_FLAG_COOLDOWN):
+            flag_suspicious_bidder.delay(user_id, auction_id, score, reasons)
+    cache.set(CURSOR_KEY, events[-1]['id'], None)
+    return len(events)
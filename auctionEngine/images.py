@@ -0,0 +1,33 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+def make_thumbnails(image_file, name_prefix, sizes=None):
+    """
+    Writes a WebP thumbnail of `image_file` for every size (longest edge in
+    pixels) through the file's storage. Returns {size: storage name}.
+    """
+    sizes = sorted(sizes or settings.AUCTION_THUMBNAIL_SIZES, reverse=True)
+    storage = image_file.storage
+    thumbnails = {}
+
+    with image_file.open('rb') as source, Image.open(source) as image:
+        # Lets the JPEG decoder scale down while decoding instead of after
+        image.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        # Each size is scaled down from the previous, smaller one
+        for size in sizes:
+            image.thumbnail((size, size))
+            buffer = BytesIO()
+            image.save(buffer, 'WEBP', quality=80, method=4)
+            name = f'{name_prefix}-{size}.webp'
+            storage.delete(name)
+            thumbnails[str(size)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    return thumbnails
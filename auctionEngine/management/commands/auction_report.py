@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctionEngine.analytics import compute_report, load_bid_columns
+from auctionEngine.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Prints price curve, bid velocity and bidder concentration for an auction as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('auction_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if not Auction.objects.filter(pk=options['auction_id']).exists():
+            raise CommandError(f"Auction {options['auction_id']} does not exist")
+        report = compute_report(*load_bid_columns(options['auction_id'], options['chunk_size']))
+        self.stdout.write(json.dumps(report, indent=2))
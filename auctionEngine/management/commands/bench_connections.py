@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+
+class Command(BaseCommand):
+    help = 'Compares opening a fresh Postgres connection per unit of work with the configured pooled/persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection benchmark needs a PostgreSQL database.')
+        iterations = options['iterations']
+
+        # What every request and Celery task paid with CONN_MAX_AGE = 0
+        params = connection.get_connection_params()
+        fresh = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            raw = connection.Database.connect(**params)
+            with raw.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            raw.close()
+            fresh.append(time.perf_counter() - start)
+
+        # Same work through Django's request lifecycle with the configured settings
+        reused = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            close_old_connections()
+            reused.append(time.perf_counter() - start)
+
+        self.report('fresh connection', fresh)
+        self.report('pooled/persistent', reused)
+        saved = (statistics.mean(fresh) - statistics.mean(reused)) * 1000
+        self.stdout.write(self.style.SUCCESS(f'Connection setup removed: {saved:.2f} ms per unit of work'))
+
+    def report(self, label, samples):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:>18}: mean {statistics.mean(samples) * 1000:.2f} ms, '
+            f'p50 {statistics.median(samples) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms'
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctionEngine.startup import PROCESSES, by_package, profile
+
+
+class Command(BaseCommand):
+    help = 'Reports cold start time and import time per package and module for the web, worker and beat processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('processes', nargs='*', help=f"Any of {', '.join(PROCESSES)}; defaults to all of them")
+        parser.add_argument('--top', type=int, default=15, help='Rows per table')
+
+    def handle(self, *args, **options):
+        unknown = set(options['processes']) - set(PROCESSES)
+        if unknown:
+            raise CommandError(f"Unknown process: {', '.join(sorted(unknown))}")
+        for process in options['processes'] or PROCESSES:
+            elapsed, modules, loaded = profile(process)
+            total = sum(self_us for self_us, _ in modules.values())
+            self.stdout.write(self.style.SUCCESS(
+                f'{process}: started in {elapsed * 1000:.0f} ms, {total / 1000:.0f} ms importing {len(loaded)} modules'
+            ))
+            self.stdout.write('  by package (self time):')
+            packages = sorted(by_package(modules).items(), key=lambda item: -item[1])
+            for package, self_us in packages[:options['top']]:
+                self.stdout.write(f'    {package:<40} {self_us / 1000:8.1f} ms')
+            self.stdout.write('  slowest modules (cumulative time):')
+            slowest = sorted(modules.items(), key=lambda item: -item[1][1])
+            for module, (self_us, cumulative_us) in slowest[:options['top']]:
+                self.stdout.write(f'    {module:<40} {cumulative_us / 1000:8.1f} ms')
+            self.stdout.write('')
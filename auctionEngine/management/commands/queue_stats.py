@@ -0,0 +1,17 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from auctionEngine.queues import queue_depths, task_latencies
+
+
+class Command(BaseCommand):
+    help = 'Prints the depth of every Celery queue and how long its tasks waited for a worker, as JSON'
+
+    def handle(self, *args, **options):
+        latencies = task_latencies()
+        stats = {
+            queue: {'depth': depth, 'latency': latencies.get(queue)}
+            for queue, depth in queue_depths().items()
+        }
+        self.stdout.write(json.dumps(stats, indent=2))
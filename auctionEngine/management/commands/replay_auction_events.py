@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from auctionEngine.events import iter_events, read_segment, rebuild_auctions, replay, write_segment
+
+
+class Command(BaseCommand):
+    help = 'Replays the auction event log to show or rebuild auction state, or exports it as an NDJSON segment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--auction', type=int, action='append', dest='auctions', help='Limit to these auction ids')
+        parser.add_argument('--at', help='Rebuild state as of this ISO timestamp')
+        parser.add_argument('--segment', help='Replay from an NDJSON segment instead of the database')
+        parser.add_argument('--export', help='Write the selected events to an NDJSON segment and exit')
+        parser.add_argument('--apply', action='store_true', help='Write the replayed state back to the auctions table')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['at']:
+            until = parse_datetime(options['at'])
+            if until is None:
+                raise CommandError(f"Invalid timestamp: {options['at']}")
+        if until and options['apply']:
+            raise CommandError('Refusing to write historical state back; drop --at to use --apply')
+
+        if options['export']:
+            with open(options['export'], 'w') as fp:
+                count = write_segment(iter_events(options['auctions'], until=until), fp)
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} events to {options['export']}"))
+            return
+
+        if options['segment']:
+            with open(options['segment']) as fp:
+                events = read_segment(fp)
+                if options['auctions']:
+                    events = (event for event in events if event['auction_id'] in options['auctions'])
+                states = replay(events, until=until)
+        else:
+            states = replay(iter_events(options['auctions'], until=until))
+
+        for state in states.values():
+            self.stdout.write(
+                f'Auction {state.auction_id}: price {state.current_price}, '
+                f"{'active' if state.is_active else 'closed'}, "
+                f'highest bidder {state.highest_bidder_id}, last event {state.last_event_id}'
+            )
+
+        if options['apply']:
+            count = rebuild_auctions(states)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} auctions'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from auctionEngine.fraud import process_new_bids
+
+
+class Command(BaseCommand):
+    help = 'Scores committed bids for shill bidding and bots, and flags suspicious bidders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when no new bids are committed')
+        parser.add_argument('--once', action='store_true', help='Score the bids committed so far and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            read = process_new_bids(options['batch_size'])
+            if read:
+                self.stdout.write(f'Scored {read} events')
+            if options['once'] and read < options['batch_size']:
+                return
+            close_old_connections()
+            if read < options['batch_size']:
+                time.sleep(options['interval'])
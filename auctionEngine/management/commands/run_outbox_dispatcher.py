@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from auctionEngine.outbox import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = 'Relays committed outbox messages to Celery and Channels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = dispatch_pending(options['batch_size'])
+            if sent:
+                self.stdout.write(f'Relayed {sent} messages')
+            if options['once'] and sent < options['batch_size']:
+                return
+            close_old_connections()
+            if sent < options['batch_size']:
+                time.sleep(options['interval'])
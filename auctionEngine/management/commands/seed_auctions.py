@@ -0,0 +1,218 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from auctionEngine.models import Auction, Bid, User
+from auctionEngine.versions import bump_list_version
+
+DAY = 86400
+DURATION_DAYS = np.array([1, 3, 5, 7, 10])
+DURATION_WEIGHTS = np.array([0.2, 0.3, 0.2, 0.25, 0.05])
+# Auctions tend to end in the evening, which is when closing sweeps get busy
+END_HOURS = np.array([12, 18, 19, 20, 21, 22])
+END_HOUR_WEIGHTS = np.array([0.05, 0.1, 0.2, 0.3, 0.25, 0.1])
+
+
+def generate_auctions(rng, count, user_ids, anchor):
+    """Returns creator ids, starting prices (cents), created_at and end_time (epoch seconds)"""
+    # A few sellers list most auctions
+    creators = user_ids[(rng.zipf(1.6, count) - 1) % len(user_ids)]
+    starting_cents = np.clip(np.round(rng.lognormal(4, 1.2, count) * 100), 100, 1_000_000).astype(np.int64)
+    created_at = anchor - rng.uniform(0, 30 * DAY, count)
+    raw_end = created_at + rng.choice(DURATION_DAYS, count, p=DURATION_WEIGHTS) * DAY
+    end_time = (raw_end // DAY) * DAY + rng.choice(END_HOURS, count, p=END_HOUR_WEIGHTS) * 3600
+    end_time = np.where(end_time <= created_at, end_time + DAY, end_time)
+    return creators, starting_cents, created_at, end_time
+
+
+def allocate_bids(rng, total, auction_count):
+    """Heavy-tailed bid counts: a handful of hot auctions and a long tail with few or none"""
+    weights = rng.pareto(1.2, auction_count) + 0.01
+    return rng.multinomial(total, weights / weights.sum())
+
+
+def generate_bids(rng, counts, creators, starting_cents, created_at, end_time, user_ids, anchor):
+    """
+    Returns per-bid auction index, user ids, amounts (cents) and created_at for a
+    batch of auctions. Amounts rise strictly within each auction, so the
+    unique (auction, amount) constraint always holds.
+    """
+    total = int(counts.sum())
+    auction_index = np.repeat(np.arange(len(counts)), counts)
+    has_bids = counts > 0
+    offsets = (np.cumsum(counts) - counts)[has_bids]
+
+    # Running total of increments, restarted at every auction
+    increments = np.maximum(1, (starting_cents[auction_index] * rng.exponential(0.01, total)).astype(np.int64))
+    running = np.cumsum(increments)
+    group_base = np.repeat((running - increments)[offsets], counts[has_bids])
+    amounts = starting_cents[auction_index] + running - group_base
+
+    # Bid times spread over each auction's open window, in amount order
+    window_end = np.minimum(end_time, anchor)
+    fractions = rng.random(total)
+    fractions = fractions[np.lexsort((fractions, auction_index))]  # sorted within each auction
+    bid_times = created_at[auction_index] + fractions * (window_end - created_at)[auction_index]
+
+    bidders = user_ids[rng.integers(0, len(user_ids), total)]
+    if len(user_ids) > 1:
+        # Sellers never bid on their own auctions
+        own = bidders == creators[auction_index]
+        bidders[own] = user_ids[(np.searchsorted(user_ids, bidders[own]) + 1) % len(user_ids)]
+    return auction_index, bidders, amounts, bid_times
+
+
+def cents_to_str(cents):
+    return [f'{value // 100}.{value % 100:02d}' for value in cents.tolist()]
+
+
+def epoch_to_str(seconds):
+    moments = np.datetime_as_string((seconds * 1e6).astype('datetime64[us]'), unit='us')
+    return [f'{moment}+00:00' for moment in moments.tolist()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic users, auctions and bids for performance testing. Rows are '
+        'written with COPY on PostgreSQL (batched INSERTs elsewhere), which skips Auction.save '
+        'and its signals, so no closing tasks or events are created for them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--auctions', type=int, default=50000)
+        parser.add_argument('--bids', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000, help='Auctions (and their bids) per batch')
+        parser.add_argument('--anchor', help='ISO timestamp the data is generated around; defaults to today 00:00 UTC')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Need at least two users so sellers and bidders differ.')
+        rng = np.random.default_rng(options['seed'])
+        if options['anchor']:
+            anchor_time = parse_datetime(options['anchor'])
+            if anchor_time is None:
+                raise CommandError(f"Invalid anchor: {options['anchor']}")
+        else:
+            anchor_time = datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        anchor = anchor_time.timestamp()
+
+        self.use_copy = connection.vendor == 'postgresql'
+        self.timings = {}
+        started = time.perf_counter()
+
+        user_ids = self.seed_users(rng, options['users'], anchor)
+        self.seed_auctions(rng, options['auctions'], options['bids'], options['batch_size'], user_ids, anchor)
+
+        if self.use_copy:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [User, Auction, Bid]):
+                    cursor.execute(sql)
+        bump_list_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
+        for label, (rows, seconds) in self.timings.items():
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f'  {label:>8}: {rows:>10,} rows in {seconds:7.1f}s ({rate:,.0f} rows/s)')
+
+    def next_id(self, model):
+        return (model.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+
+    def seed_users(self, rng, count, anchor):
+        first_id = self.next_id(User)
+        user_ids = np.arange(first_id, first_id + count, dtype=np.int64)
+        password = make_password('seedpass123')  # hashed once and shared by every seeded user
+        joined = epoch_to_str(anchor - rng.uniform(0, 365 * DAY, count))
+        rows = [
+            (user_id, f'seed-{user_id}@example.com', f'Seed user {user_id}', password, joined[i],
+             None, None, '', '', False, False, True)
+            for i, user_id in enumerate(user_ids.tolist())
+        ]
+        columns = ['id', 'email', 'name', 'password', 'date_joined', 'last_login', 'username',
+                   'first_name', 'last_name', 'is_superuser', 'is_staff', 'is_active']
+        self.insert('users', User, columns, rows)
+        return user_ids
+
+    def seed_auctions(self, rng, count, total_bids, batch_size, user_ids, anchor):
+        next_auction_id = self.next_id(Auction)
+        next_bid_id = first_bid_id = self.next_id(Bid)
+        bid_counts = allocate_bids(rng, total_bids, count)
+
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            creators, starting_cents, created_at, end_time = generate_auctions(rng, size, user_ids, anchor)
+            counts = bid_counts[start:start + size]
+            auction_index, bidders, amounts, bid_times = generate_bids(
+                rng, counts, creators, starting_cents, created_at, end_time, user_ids, anchor
+            )
+
+            # Current price is the last (highest) bid, or the starting price without bids
+            current_cents = starting_cents.copy()
+            has_bids = counts > 0
+            current_cents[has_bids] = amounts[np.cumsum(counts)[has_bids] - 1]
+
+            auction_ids = np.arange(next_auction_id, next_auction_id + size, dtype=np.int64)
+            next_auction_id += size
+            starting, current = cents_to_str(starting_cents), cents_to_str(current_cents)
+            created, ends = epoch_to_str(created_at), epoch_to_str(end_time)
+            active = (end_time > anchor).tolist()
+            no_thumbnails = '{}' if self.use_copy else {}
+            base_currency = settings.BASE_CURRENCY
+            auction_rows = [
+                (auction_id, f'Seed auction {auction_id}', 'Synthetic auction for performance testing',
+                 None, no_thumbnails, starting[i], current[i], created[i], ends[i], int(creators[i]), active[i],
+                 Auction.ENGLISH, None, 0, base_currency, current[i])
+                for i, auction_id in enumerate(auction_ids.tolist())
+            ]
+
+            bid_ids = range(next_bid_id, next_bid_id + len(amounts))
+            next_bid_id += len(amounts)
+            bid_auctions = auction_ids[auction_index].tolist()
+            bid_users, bid_amounts, bid_created = bidders.tolist(), cents_to_str(amounts), epoch_to_str(bid_times)
+            bid_rows = [
+                (bid_id, bid_auctions[i], bid_users[i], bid_amounts[i], False, bid_created[i])
+                for i, bid_id in enumerate(bid_ids)
+            ]
+
+            with transaction.atomic():
+                self.insert('auctions', Auction, [
+                    'id', 'name', 'description', 'image', 'thumbnails', 'starting_price', 'current_price',
+                    'created_at', 'end_time', 'creator_id', 'is_active', 'format', 'reserve_price', 'version',
+                    'currency', 'normalized_price',
+                ], auction_rows)
+                self.insert('bids', Bid, ['id', 'auction_id', 'user_id', 'amount', 'sealed', 'created_at'], bid_rows)
+
+            self.stdout.write(f'  auctions {start + size:,}/{count:,}, bids {next_bid_id - first_bid_id:,}/{total_bids:,}')
+
+    def insert(self, label, model, columns, rows):
+        started = time.perf_counter()
+        quote = connection.ops.quote_name
+        fields = [model._meta.get_field(name) for name in columns]
+        table = quote(model._meta.db_table)
+        column_sql = ', '.join(quote(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                with cursor.cursor.copy(f'COPY {table} ({column_sql}) FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                # Raw INSERTs rather than bulk_create, so auto_now_add keeps the generated times
+                placeholders = ', '.join(['%s'] * len(fields))
+                cursor.executemany(
+                    f'INSERT INTO {table} ({column_sql}) VALUES ({placeholders})',
+                    [
+                        [field.get_db_prep_save(field.to_python(value), connection) for field, value in zip(fields, row)]
+                        for row in rows
+                    ],
+                )
+        seen_rows, seen_seconds = self.timings.get(label, (0, 0.0))
+        self.timings[label] = (seen_rows + len(rows), seen_seconds + time.perf_counter() - started)
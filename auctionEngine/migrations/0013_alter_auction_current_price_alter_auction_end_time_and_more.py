@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:30
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0012_alter_auction_end_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auction',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0.01)]),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 30, 6, 120936, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='starting_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0.01)]),
+        ),
+        migrations.CreateModel(
+            name='AuctionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('opened', 'Opened'), ('bid_accepted', 'Bid accepted'), ('bid_rejected', 'Bid rejected'), ('extended', 'Extended'), ('closed', 'Closed')], max_length=20)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('auction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='auctionEngine.auction')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['auction', 'id'], name='auctionEngi_auction_ffcd40_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:31
+
+import datetime
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0013_alter_auction_current_price_alter_auction_end_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 31, 40, 878400, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(choices=[('celery', 'Celery task'), ('channels', 'Channels group')], default='celery', max_length=20)),
+                ('topic', models.CharField(max_length=255)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('dedupe_key', models.CharField(max_length=255, unique=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['available_at'],
+                'indexes': [models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['available_at'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
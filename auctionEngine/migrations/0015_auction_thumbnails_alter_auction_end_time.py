@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:33
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0014_alter_auction_end_time_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 33, 11, 722129, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:34
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0015_auction_thumbnails_alter_auction_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 34, 25, 339756, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:36
+
+import datetime
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0016_auction_version_alter_auction_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='format',
+            field=models.CharField(choices=[('english', 'English (open ascending)'), ('sealed_first_price', 'Sealed bid, first price'), ('vickrey', 'Sealed bid, second price'), ('dutch', 'Dutch (descending)')], default='english', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='reserve_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0.01)]),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 36, 37, 427214, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AlterField(
+            model_name='auctionevent',
+            name='kind',
+            field=models.CharField(choices=[('opened', 'Opened'), ('bid_accepted', 'Bid accepted'), ('bid_rejected', 'Bid rejected'), ('sealed_bid', 'Sealed bid placed'), ('extended', 'Extended'), ('closed', 'Closed')], max_length=20),
+        ),
+    ]
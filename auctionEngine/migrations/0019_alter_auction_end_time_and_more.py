@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:46
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0018_alter_auction_end_time_notification_watch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 46, 39, 839117, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['end_time', 'id'], name='auction_ending_soon_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-19 15:51
+
+import datetime
+from django.db import migrations, models
+from django.db.models import F
+
+
+def normalize_existing_prices(apps, schema_editor):
+    # Every existing auction is priced in the base currency
+    Auction = apps.get_model('auctionEngine', 'Auction')
+    Auction.objects.update(normalized_price=F('current_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0019_alter_auction_end_time_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('currency', models.CharField(max_length=3, primary_key=True, serialize=False)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='normalized_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 15, 51, 28, 633619, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['normalized_price'], name='auctionEngi_normali_efb065_idx'),
+        ),
+        migrations.RunPython(normalize_existing_prices, migrations.RunPython.noop),
+    ]
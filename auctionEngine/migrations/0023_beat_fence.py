@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:07
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0022_suspicious_bidders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeatFence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('token', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 16, 7, 23, 443146, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:18
+
+import datetime
+from django.db import migrations, models
+
+
+def mark_sealed_bids(apps, schema_editor):
+    # The formats that hide bids when this migration was written
+    Bid = apps.get_model('auctionEngine', 'Bid')
+    Bid.objects.filter(auction__format__in=['sealed_first_price', 'vickrey']).update(sealed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0023_beat_fence'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='bid',
+            name='unique_bid_amount_per_auction',
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='sealed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_sealed_bids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 16, 18, 26, 769460, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddConstraint(
+            model_name='bid',
+            constraint=models.UniqueConstraint(condition=models.Q(('sealed', False)), fields=('auction', 'amount'), name='unique_bid_amount_per_auction'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:34
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctionEngine', '0024_sealed_bid_ties'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beatfence',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='beatfence',
+            name='holder',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='end_time',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 20, 16, 34, 35, 150911, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
@@ -1,10 +1,12 @@
 from datetime import timedelta
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.dispatch import receiver
 from django.db.models.signals import post_save
+from .versions import bump_list_version
 
 class UserManager(BaseUserManager):
     def create_superuser(self, email, username=None, password=None, **extra_fields):
@@ -41,21 +43,45 @@ class User(AbstractUser):
     objects = UserManager()
 
 class Auction(models.Model):
+    ENGLISH = 'english'
+    SEALED_FIRST_PRICE = 'sealed_first_price'
+    VICKREY = 'vickrey'
+    DUTCH = 'dutch'
+    FORMAT_CHOICES = [
+        (ENGLISH, 'English (open ascending)'),
+        (SEALED_FIRST_PRICE, 'Sealed bid, first price'),
+        (VICKREY, 'Sealed bid, second price'),
+        (DUTCH, 'Dutch (descending)'),
+    ]
+
     name = models.CharField(max_length=255)
     description = models.TextField()
     image = models.ImageField(upload_to='auctions/', null=True)
+    thumbnails = models.JSONField(default=dict, blank=True)  # {longest edge: storage name}
     starting_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.01)])
     current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, validators=[MinValueValidator(0.01)])
     created_at = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(default=(timezone.now() + timedelta(days=1)))
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True)
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default=ENGLISH)
+    reserve_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0.01)])  # Dutch price floor
+    version = models.PositiveIntegerField(default=0)  # Bumped on every change, used for ETags
+    currency = models.CharField(max_length=3, default=settings.BASE_CURRENCY)
+    normalized_price = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)  # current_price in BASE_CURRENCY
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['is_active']),
             models.Index(fields=['end_time']),
+            models.Index(fields=['normalized_price']),
+            # Open auctions by end time; closing drops a row out of it
+            models.Index(
+                fields=['end_time', 'id'],
+                name='auction_ending_soon_idx',
+                condition=models.Q(is_active=True),
+            ),
         ]
 
     def __str__(self):
@@ -69,34 +95,97 @@ class Auction(models.Model):
     @property
     def highest_bidder(self):
         """Returns the user with the highest bid"""
-        highest_bid = self.bids.order_by('-amount').first()
+        highest_bid = self.bids.order_by('-amount', 'created_at', 'id').first()
         return highest_bid.user if highest_bid else None
 
+    @property
+    def live_price(self):
+        """Current price as the auction's format computes it"""
+        return self.get_format().live_price(self)
+
+    def get_format(self):
+        from .formats import get_format
+        return get_format(self.format)
+
     def update_status(self):
         """Check and update auction active status"""
         if self.end_time <= timezone.now():
-            self.is_active = False
-            self.save()
+            self.close()
             return False
         return True
+
+    def close(self):
+        """Resolve the winner, close the auction and queue the result emails"""
+        with transaction.atomic():
+            # This instance may predate a bid or another sweep's close, so the
+            # close works on the locked row as it is now. Whichever sweep locks
+            # it second finds it closed and leaves it alone.
+            auction = Auction.objects.select_for_update().get(pk=self.pk)
+            closed = auction.is_active
+            if closed:
+                winner_id, price = auction.get_format().resolve(auction)
+                auction.current_price = price
+                auction.is_active = False
+                auction.save()
+                AuctionEvent.record(auction, AuctionEvent.CLOSED, user_id=winner_id, amount=price)
+                # Sent by the outbox dispatcher only once the close has committed
+                OutboxMessage.enqueue(
+                    'auctionEngine.tasks.send_auction_result_emails',
+                    dedupe_key=f'auction-result-emails:{self.pk}',
+                    payload={'auction_id': self.pk},
+                )
+        for field in ('current_price', 'normalized_price', 'is_active', 'version'):
+            setattr(self, field, getattr(auction, field))
+        return closed
     
+    def schedule_thumbnails(self):
+        """Queue WebP thumbnail generation for the current image once this transaction commits"""
+        if self.image:
+            OutboxMessage.enqueue(
+                'auctionEngine.tasks.generate_thumbnails',
+                dedupe_key=f'thumbnails:{self.pk}:{self.image.name}',
+                payload={'auction_id': self.pk},
+            )
+
     def save(self, *args, **kwargs):
-        if not self.pk:  # New auction being created
-            from .tasks import check_ended_auctions
-            check_ended_auctions.apply_async(eta=self.end_time)
-        super().save(*args, **kwargs)
+        creating = not self.pk
+        if not creating:
+            self.version += 1
+        from .currency import to_base
+        self.normalized_price = to_base(self.current_price, self.currency)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            transaction.on_commit(bump_list_version)
+            if creating:
+                # Closing sweep at end_time, relayed to Celery once this insert commits
+                OutboxMessage.enqueue(
+                    'auctionEngine.tasks.check_ended_auctions',
+                    dedupe_key=f'close-auction:{self.pk}',
+                    available_at=self.end_time,
+                )
+                from .notifications import schedule_ending_soon
+                schedule_ending_soon(self)
+                OutboxMessage.enqueue(
+                    'auctionEngine.tasks.match_saved_searches',
+                    dedupe_key=f'saved-search-match:{self.pk}',
+                    payload={'auction_id': self.pk},
+                )
 
 class Bid(models.Model):
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='bids')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    sealed = models.BooleanField(default=False)  # Placed in a format that hides bids, copied from the auction
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
         constraints = [
+            # Sealed bids may tie: rejecting one would reveal that someone
+            # already bid that amount. Ties go to the earlier bid.
             models.UniqueConstraint(
                 fields=['auction', 'amount'],
+                condition=models.Q(sealed=False),
                 name='unique_bid_amount_per_auction'
             )
         ]
@@ -105,15 +194,241 @@ class Bid(models.Model):
         return f"${self.amount} on {self.auction.name} by {self.user.email}"
 
     def save(self, *args, **kwargs):
-        """Override save to update auction price"""
+        """Override save to let the auction's format record the bid"""
+        self.sealed = self.auction.get_format().hides_bids
         self.full_clean()  # Runs clean() validation
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.auction.get_format().record_bid(self.auction, self)
+
+class AuctionEvent(models.Model):
+    """Append-only log of everything that changed an auction's state"""
+    OPENED = 'opened'
+    BID_ACCEPTED = 'bid_accepted'
+    BID_REJECTED = 'bid_rejected'
+    SEALED_BID = 'sealed_bid'
+    EXTENDED = 'extended'
+    CLOSED = 'closed'
+    KIND_CHOICES = [
+        (OPENED, 'Opened'),
+        (BID_ACCEPTED, 'Bid accepted'),
+        (BID_REJECTED, 'Bid rejected'),
+        (SEALED_BID, 'Sealed bid placed'),
+        (EXTENDED, 'Extended'),
+        (CLOSED, 'Closed'),
+    ]
+
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['auction', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} on auction {self.auction_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError('Auction events are append-only')
         super().save(*args, **kwargs)
-        self.auction.current_price = self.amount
-        self.auction.save()
+
+    @classmethod
+    def record(cls, auction, kind, **fields):
+        return cls.objects.create(auction=auction, kind=kind, **fields)
+
+class OutboxMessage(models.Model):
+    """
+    Side effect written in the same transaction as the data it depends on.
+    The outbox dispatcher relays it to Celery or Channels after commit.
+    """
+    CELERY = 'celery'
+    CHANNELS = 'channels'
+    DESTINATION_CHOICES = [
+        (CELERY, 'Celery task'),
+        (CHANNELS, 'Channels group'),
+    ]
+
+    destination = models.CharField(max_length=20, choices=DESTINATION_CHOICES, default=CELERY)
+    topic = models.CharField(max_length=255)  # Celery task name or Channels group
+    payload = models.JSONField(default=dict, blank=True)  # Task kwargs or channel message
+    dedupe_key = models.CharField(max_length=255, unique=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['available_at']
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                name='outbox_pending_idx',
+                condition=models.Q(dispatched_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.destination}:{self.topic} ({self.dedupe_key})"
+
+    @classmethod
+    def enqueue(cls, topic, dedupe_key, payload=None, destination=CELERY, available_at=None):
+        """Adds a message unless one with the same dedupe key already exists"""
+        message, created = cls.objects.get_or_create(
+            dedupe_key=dedupe_key,
+            defaults={
+                'topic': topic,
+                'payload': payload or {},
+                'destination': destination,
+                'available_at': available_at or timezone.now(),
+            },
+        )
+        return message
+
+class BeatFence(models.Model):
+    """
+    Highest fencing token seen for a beat-driven sweep. A sweep sent by a beat
+    replica that has since lost leadership carries an older token and is turned
+    away, so only the current leader's sweeps run.
+
+    The beat leader's lease is a row of its own: it issues the tokens, and
+    holder and expires_at say who leads and until when (see beat.LeaderLease).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    token = models.BigIntegerField(default=0)
+    holder = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at token {self.token}"
+
+    @classmethod
+    def admit(cls, name, token):
+        """Records `token` and returns True, unless a newer token was already seen"""
+        with transaction.atomic():
+            fence, _ = cls.objects.select_for_update().get_or_create(name=name)
+            if token < fence.token:
+                return False
+            if token > fence.token:
+                fence.token = token
+                fence.save(update_fields=['token', 'updated_at'])
+            return True
+
+class ExchangeRate(models.Model):
+    """Latest rate for a currency, refreshed by the refresh_exchange_rates task"""
+    currency = models.CharField(max_length=3, primary_key=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)  # Units of this currency per one BASE_CURRENCY
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"1 {settings.BASE_CURRENCY} = {self.rate} {self.currency}"
+
+class Watch(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watches')
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='watchers')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['auction', 'user'],
+                name='unique_watch_per_user'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} watches {self.auction_id}"
+
+class Notification(models.Model):
+    OUTBID = 'outbid'
+    NEW_BID = 'new_bid'
+    ENDING_SOON = 'ending_soon'
+    SEARCH_MATCH = 'search_match'
+    KIND_CHOICES = [
+        (OUTBID, 'Outbid'),
+        (NEW_BID, 'New bid'),
+        (ENDING_SOON, 'Ending soon'),
+        (SEARCH_MATCH, 'Saved search match'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    auction = models.ForeignKey(Auction, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.user_id}: {self.message}"
+
+class SavedSearch(models.Model):
+    """
+    An auction list query kept on the server. New auctions are matched against
+    it when they are created, through the SavedSearchKey index.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=255, blank=True)  # Every word must appear in the auction name
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=3, default=settings.BASE_CURRENCY)  # Of min_price and max_price
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user_id}: {self.name or '*'} {self.min_price}-{self.max_price} {self.currency}"
+
+    def save(self, *args, **kwargs):
+        from .searches import index_keys
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.keys.all().delete()
+            SavedSearchKey.objects.bulk_create([SavedSearchKey(search=self, key=key) for key in index_keys(self)])
+
+class SavedSearchKey(models.Model):
+    """Inverted index entry: a term or price bucket a new auction must have to match the search"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    key = models.CharField(max_length=100, db_index=True)
+
+    def __str__(self):
+        return f"{self.key} -> {self.search_id}"
+
+class SuspiciousBidder(models.Model):
+    """An account the bid stream scored as a likely shill or bot, kept for review"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suspicious_flags')
+    auction = models.ForeignKey(Auction, on_delete=models.SET_NULL, null=True, blank=True)  # Where the score crossed the threshold
+    score = models.FloatField()
+    reasons = models.JSONField(default=list)  # Signals that drove the score: cadence, increment, seller
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} scored {self.score} ({', '.join(self.reasons)})"
 
 @receiver(post_save, sender=Auction)
 def set_initial_price(sender, instance, created, **kwargs):
     """Set current_price = starting_price when auction is created"""
     if created:
         instance.current_price = instance.starting_price
-        instance.save()
\ No newline at end of file
+        instance.save()
+        AuctionEvent.record(instance, AuctionEvent.OPENED, amount=instance.starting_price, end_time=instance.end_time)
\ No newline at end of file
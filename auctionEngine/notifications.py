@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Bid, Notification, OutboxMessage, User, Watch
+
+
+def user_group(user_id):
+    """Channels group every websocket of a user joins"""
+    return f'user-{user_id}'
+
+
+def coalescing_window(moment):
+    """Start and end of the coalescing window `moment` falls in"""
+    seconds = settings.NOTIFICATION_COALESCE_SECONDS
+    start = int(moment.timestamp() // seconds) * seconds
+    return datetime.fromtimestamp(start, dt_timezone.utc), datetime.fromtimestamp(start + seconds, dt_timezone.utc)
+
+
+def schedule_outbid(auction):
+    """
+    Called on every accepted bid. All bids on an auction within one window
+    share a single fan-out at the window's end, so this is one outbox lookup
+    (plus one insert for the first bid of the window) however many users watch.
+    """
+    start, end = coalescing_window(timezone.now())
+    OutboxMessage.enqueue(
+        'auctionEngine.tasks.fan_out_notifications',
+        dedupe_key=f'outbid:{auction.pk}:{int(start.timestamp())}',
+        payload={'auction_id': auction.pk, 'kind': Notification.OUTBID, 'since': start.isoformat()},
+        available_at=end,
+    )
+
+
+def schedule_ending_soon(auction):
+    OutboxMessage.enqueue(
+        'auctionEngine.tasks.fan_out_notifications',
+        dedupe_key=f'ending-soon:{auction.pk}',
+        payload={'auction_id': auction.pk, 'kind': Notification.ENDING_SOON},
+        available_at=auction.end_time - timedelta(seconds=settings.ENDING_SOON_NOTICE),
+    )
+
+
+def build_notifications(auction, kind, since=None):
+    """
+    Returns [user id, kind, message] for everyone to notify about `auction`.
+    Outbid fan-outs reflect the auction as it is now, so each user gets only
+    the latest state however many bids landed in the window.
+    """
+    if not auction.is_active:
+        return []
+    watcher_ids = set(Watch.objects.filter(auction=auction).values_list('user_id', flat=True))
+
+    if kind == Notification.ENDING_SOON:
+        message = f'{auction.name} ends soon, current price ${auction.live_price}'[:255]
+        return [[user_id, kind, message] for user_id in sorted(watcher_ids)]
+
+    since = parse_datetime(since)
+    leader_id = auction.bids.order_by('-amount', 'created_at', 'id').values_list('user_id', flat=True).first()
+    # Outbid: everyone who bid in the window, and whoever led before it
+    outbid = set(
+        Bid.objects.filter(auction=auction, created_at__gte=since)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    previous_leader_id = (
+        auction.bids.filter(created_at__lt=since)
+        .order_by('-amount', 'created_at', 'id')
+        .values_list('user_id', flat=True)
+        .first()
+    )
+    if previous_leader_id is not None:
+        outbid.add(previous_leader_id)
+    notifications = []
+    for user_id in sorted((watcher_ids | outbid) - {leader_id}):
+        if user_id in outbid:
+            notifications.append([user_id, Notification.OUTBID, f'You have been outbid on {auction.name}, now ${auction.current_price}'[:255]])
+        else:
+            notifications.append([user_id, Notification.NEW_BID, f'New bid on {auction.name}, now ${auction.current_price}'[:255]])
+    return notifications
+
+
+def deliver(auction_id, notifications):
+    """Stores, emails and pushes one batch of notifications"""
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, auction_id=auction_id, kind=kind, message=message)
+        for user_id, kind, message in notifications
+    ])
+
+    emails = dict(User.objects.filter(pk__in=[user_id for user_id, _, _ in notifications]).values_list('id', 'email'))
+    messages = [
+        EmailMessage(message, message, settings.DEFAULT_FROM_EMAIL, [emails[user_id]])
+        for user_id, _, message in notifications
+        if user_id in emails
+    ]
+    # One connection for the whole batch
+    get_connection().send_messages(messages)
+
+    from channels.layers import get_channel_layer
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        for user_id, kind, message in notifications:
+            async_to_sync(channel_layer.group_send)(user_group(user_id), {
+                'type': 'notify',
+                'notification': {'auction': auction_id, 'kind': kind, 'message': message},
+            })
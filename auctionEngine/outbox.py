@@ -0,0 +1,78 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from celery import current_app
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+TASK_ID_PREFIX = 'outbox-'
+DELIVERY_MEMORY = 60 * 60 * 24  # seconds a delivered message id is remembered
+
+
+def relay(message):
+    if message.destination == OutboxMessage.CHANNELS:
+        from channels.layers import get_channel_layer
+        async_to_sync(get_channel_layer().group_send)(message.topic, message.payload)
+    else:
+        # A fixed task id lets consumers recognise a redelivered message
+        current_app.send_task(message.topic, kwargs=message.payload, task_id=f'{TASK_ID_PREFIX}{message.pk}')
+
+
+def dispatch_pending(batch_size=100):
+    """
+    Relays one batch of due messages and marks them dispatched. Rows are
+    locked with SKIP LOCKED so several dispatchers can run side by side.
+    Delivery is at-least-once: a crash between relay and commit resends.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        sent = []
+        for message in messages:
+            try:
+                relay(message)
+            except Exception:
+                # Most likely the broker is down; keep order and retry the rest next round
+                logger.exception('Failed to relay outbox message %s', message.pk)
+                OutboxMessage.objects.filter(pk=message.pk).update(attempts=F('attempts') + 1)
+                break
+            sent.append(message.pk)
+        OutboxMessage.objects.filter(pk__in=sent).update(dispatched_at=timezone.now())
+    return len(sent)
+
+
+def _delivered_key(task):
+    task_id = task.request.id or ''
+    return f'outbox-delivered:{task_id}' if task_id.startswith(TASK_ID_PREFIX) else None
+
+
+def already_delivered(task):
+    """True when a task is a redelivery of an outbox message that already completed"""
+    key = _delivered_key(task)
+    return key is not None and bool(cache.get(key))
+
+
+def mark_delivered(task):
+    """
+    Called once a task has done its work. A task that crashes or fails
+    before this is left unmarked, so its redelivery still runs.
+    """
+    key = _delivered_key(task)
+    if key is not None:
+        cache.set(key, True, DELIVERY_MEMORY)
+
+
+def prune_dispatched(older_than=timedelta(days=7)):
+    deleted, _ = OutboxMessage.objects.filter(dispatched_at__lt=timezone.now() - older_than).delete()
+    return deleted
@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, get_hasher, identify_hasher, make_password
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the work factor taken from PASSWORD_HASH_ITERATIONS, so tests
+    can hash cheaply. Existing hashes are upgraded on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+
+class PasswordHashingBusy(Exception):
+    """Every password hashing slot stayed taken for PASSWORD_HASH_TIMEOUT seconds"""
+
+
+_pool_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _pool():
+    # Created on first use so every forked worker process gets its own threads
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+    return _executor, _slots
+
+
+def run_bounded(fn, *args):
+    """
+    Runs a hashing call on the bounded pool. Callers beyond the pool and its
+    queue wait up to PASSWORD_HASH_TIMEOUT and then get PasswordHashingBusy,
+    so a login burst can't take every CPU away from bid requests.
+    """
+    executor, slots = _pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashingBusy()
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(raw_password):
+    return run_bounded(make_password, raw_password)
+
+
+def verify_password(user, raw_password):
+    """Checks the password on the pool and upgrades outdated hashes"""
+    encoded = user.password
+    if not run_bounded(check_password, raw_password, encoded):
+        return False
+    if identify_hasher(encoded).algorithm != get_hasher().algorithm or get_hasher().must_update(encoded):
+        try:
+            user.password = hash_password(raw_password)
+        except PasswordHashingBusy:
+            return True  # The password is right; the upgrade waits for a quieter login
+        user.save(update_fields=['password'])
+    return True
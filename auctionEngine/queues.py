@@ -0,0 +1,75 @@
+import time
+
+from celery import current_app
+from celery.signals import before_task_publish, task_prerun
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+PUBLISHED_HEADER = 'published_at'
+METRICS_TIMEOUT = 60 * 60 * 24  # seconds latency counters live without new tasks
+
+
+def queue_names():
+    return [queue.name for queue in current_app.conf.task_queues or []]
+
+
+def queue_depths():
+    """Messages waiting in each configured queue, read from the broker"""
+    depths = {}
+    with current_app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for name in queue_names():
+            # A passive declare only reports on the queue, it never creates it
+            try:
+                depths[name] = channel.queue_declare(queue=name, passive=True).message_count
+            except connection.channel_errors:
+                depths[name] = 0
+                channel = connection.channel()
+    return depths
+
+
+def _latency_key(queue, field):
+    return f'task-latency:{queue}:{field}'
+
+
+def record_latency(queue, milliseconds):
+    for field, amount in (('count', 1), ('total_ms', milliseconds)):
+        key = _latency_key(queue, field)
+        cache.add(key, 0, METRICS_TIMEOUT)
+        cache.incr(key, amount)
+    cache.set(_latency_key(queue, 'last_ms'), milliseconds, METRICS_TIMEOUT)
+
+
+def task_latencies():
+    """Count, mean and last wait between a task being due and a worker starting it, per queue"""
+    latencies = {}
+    for queue in queue_names():
+        values = cache.get_many([_latency_key(queue, field) for field in ('count', 'total_ms', 'last_ms')])
+        count = values.get(_latency_key(queue, 'count'), 0)
+        latencies[queue] = {
+            'count': count,
+            'mean_ms': round(values.get(_latency_key(queue, 'total_ms'), 0) / count) if count else None,
+            'last_ms': values.get(_latency_key(queue, 'last_ms')),
+        }
+    return latencies
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(PUBLISHED_HEADER, time.time())
+
+
+@task_prerun.connect
+def measure_latency(task=None, **kwargs):
+    request = task.request
+    published_at = request.get(PUBLISHED_HEADER)
+    if published_at is None:
+        return  # Eager calls never go through the broker
+    due = published_at
+    if request.eta:
+        # ETA tasks wait on purpose; only the delay past their ETA counts
+        eta = parse_datetime(request.eta) if isinstance(request.eta, str) else request.eta
+        due = max(due, eta.timestamp())
+    queue = (request.delivery_info or {}).get('routing_key') or current_app.conf.task_default_queue
+    record_latency(queue, max(0, round((time.time() - due) * 1000)))
@@ -0,0 +1,79 @@
+import math
+import re
+
+from .currency import convert, exchange_rates, to_base
+from .models import Notification, SavedSearch
+
+WORD = re.compile(r'\w+')
+MAX_TERM_LENGTH = 90
+PRICE_BUCKETS = 32  # Powers of two in the base currency; the last one is open-ended
+
+
+def terms(text):
+    return {word[:MAX_TERM_LENGTH] for word in WORD.findall(text.lower())}
+
+
+def price_bucket(amount):
+    if amount is None or amount < 1:
+        return 0
+    return min(int(math.log2(amount)), PRICE_BUCKETS - 1)
+
+
+def index_keys(search):
+    """
+    Keys a saved search is filed under. Searches with words are filed under
+    their longest (most selective) word only, price-only searches under every
+    price bucket their range covers, and searches with neither under 'all'.
+    Bounds are converted at today's rates, so ranges get one spare bucket on
+    each side.
+    """
+    words = terms(search.name)
+    if words:
+        return [f'term:{max(words, key=lambda word: (len(word), word))}']
+    if search.min_price is None and search.max_price is None:
+        return ['all']
+    low, high = to_base(search.min_price, search.currency), to_base(search.max_price, search.currency)
+    first = price_bucket(low) - 1 if low is not None else 0
+    last = price_bucket(high) + 1 if high is not None else PRICE_BUCKETS - 1
+    return [f'price:{bucket}' for bucket in range(max(first, 0), min(last, PRICE_BUCKETS - 1) + 1)]
+
+
+def auction_keys(auction):
+    """Every key a saved search matching `auction` can be filed under"""
+    keys = [f'term:{word}' for word in terms(auction.name)]
+    keys.append(f'price:{price_bucket(auction.normalized_price)}')
+    keys.append('all')
+    return keys
+
+
+def matches(search, auction, rates):
+    """The exact check, run only on the candidates the index returns"""
+    if not terms(search.name) <= terms(auction.name):
+        return False
+    if search.min_price is None and search.max_price is None:
+        return True
+    price = convert(auction.current_price, auction.currency, search.currency, rates)
+    if price is None:
+        return False
+    if search.min_price is not None and price < search.min_price:
+        return False
+    return search.max_price is None or price <= search.max_price
+
+
+def match_auction(auction):
+    """
+    Returns [user id, kind, message] for every user with a saved search that
+    matches the new auction. One indexed lookup finds the candidate searches,
+    however many searches are saved.
+    """
+    if not auction.is_active:
+        return []
+    candidates = (
+        SavedSearch.objects.filter(keys__key__in=auction_keys(auction))
+        .exclude(user_id=auction.creator_id)
+        .distinct()
+    )
+    rates = exchange_rates()
+    user_ids = sorted({search.user_id for search in candidates if matches(search, auction, rates)})
+    message = f'New auction matching your saved search: {auction.name}, {auction.current_price} {auction.currency}'[:255]
+    return [[user_id, Notification.SEARCH_MATCH, message] for user_id in user_ids]
@@ -1,12 +1,112 @@
 from rest_framework import serializers
-from .models import User, Auction, Bid
+from django.conf import settings
+from django.core.files.storage import default_storage
+from .models import User, Auction, Bid, Notification, SavedSearch
+from .currency import convert
+
+class ThumbnailsField(serializers.ReadOnlyField):
+    """Turns {size: storage name} into {size: URL}"""
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for size, name in value.items():
+            url = default_storage.url(name)
+            urls[size] = request.build_absolute_uri(url) if request else url
+        return urls
+
+class DisplayPriceField(serializers.Field):
+    """
+    The live price converted to the `display_currency` in the serializer
+    context, using the rates the view loaded once for the whole page
+    """
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, auction):
+        currency = self.context.get('display_currency')
+        if not currency:
+            return None
+        amount = convert(auction.live_price, auction.currency, currency, self.context.get('rates'))
+        return {'amount': str(amount), 'currency': currency} if amount is not None else None
+
+# Model columns Auction.live_price reads, for every format
+LIVE_PRICE_COLUMNS = ['current_price', 'format', 'is_active', 'reserve_price', 'starting_price', 'created_at', 'end_time']
+
+class SparseFieldsMixin:
+    """
+    Renders only the fields in context['fields'] (every field when absent) and
+    nests the relations in context['expand'] instead of their ids.
+
+    `columns` maps fields that aren't plain model fields to the model columns
+    they read, and `expandable` maps relations to the serializer nesting them,
+    so `project` can load exactly what the chosen fields need.
+    """
+    columns = {}
+    expandable = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in self.context.get('expand', []):
+            self.fields[name] = self.expandable[name](read_only=True)
+
+    @classmethod
+    def select(cls, fields_param, expand_param):
+        """Parses ?fields= and ?expand= into (field names or None, relation names)"""
+        available = list(cls().fields)
+        fields = [name for name in fields_param.split(',') if name] if fields_param else None
+        expand = [name for name in expand_param.split(',') if name] if expand_param else []
+        unknown = [name for name in fields or [] if name not in available]
+        if unknown:
+            raise serializers.ValidationError({'fields': f'Unknown fields {", ".join(unknown)}; choose from {", ".join(available)}.'})
+        unknown = [name for name in expand if name not in cls.expandable]
+        if unknown:
+            raise serializers.ValidationError({'expand': f'Cannot expand {", ".join(unknown)}; choose from {", ".join(cls.expandable)}.'})
+        if fields is not None:
+            fields += [name for name in expand if name not in fields]
+        return fields, expand
+
+    @classmethod
+    def project(cls, queryset, fields, expand, extra_columns=()):
+        """Restricts the queryset to the columns `fields` read and joins the expanded relations"""
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields is None:
+            return queryset
+        columns = {'id', *extra_columns}
+        for name in fields:
+            columns.update(cls.columns.get(name, [name]))
+        for name in expand:
+            columns.update(f'{name}__{column}' for column in cls.expandable[name].Meta.fields)
+        return queryset.only(*columns)
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'name', 'email']
+
+class AuctionSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Auction
+        fields = ['id', 'name', 'currency', 'is_active', 'end_time']
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta(object):
         model = User 
         fields = ['id', 'name', 'password', 'email']
+        extra_kwargs = {'password': {'write_only': True}}
+
+class AuctionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    columns = {'current_price': LIVE_PRICE_COLUMNS}
+    expandable = {'creator': UserSummarySerializer}
+    thumbnails = ThumbnailsField()
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, source='live_price', read_only=True)
 
-class AuctionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Auction
         fields = '__all__'
@@ -14,14 +114,35 @@ class AuctionSerializer(serializers.ModelSerializer):
 class AuctionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Auction
-        fields = ['id', 'name', 'description', 'starting_price']
+        fields = ['id', 'name', 'description', 'starting_price', 'currency', 'image', 'format', 'reserve_price']
+        extra_kwargs = {'image': {'required': False}}
+
+    def validate_currency(self, value):
+        if value not in settings.CURRENCIES:
+            raise serializers.ValidationError(f'Supported currencies are {", ".join(settings.CURRENCIES)}.')
+        return value
+
+    def validate(self, data):
+        if data.get('format') == Auction.DUTCH:
+            reserve_price = data.get('reserve_price')
+            if reserve_price is None or reserve_price >= data['starting_price']:
+                raise serializers.ValidationError({'reserve_price': 'Dutch auctions need a reserve price below the starting price.'})
+        return data
+
+class AuctionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    columns = {'current_price': LIVE_PRICE_COLUMNS, 'display_price': LIVE_PRICE_COLUMNS + ['currency']}
+    expandable = {'creator': UserSummarySerializer}
+    thumbnails = ThumbnailsField()
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, source='live_price', read_only=True)
+    display_price = DisplayPriceField()
 
-class AuctionListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Auction
-        fields = ['id', 'name', 'current_price', 'end_time', 'is_active', 'creator']
+        fields = ['id', 'name', 'current_price', 'currency', 'display_price', 'end_time', 'is_active', 'creator', 'format', 'thumbnails']
+
+class BidSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable = {'user': UserSummarySerializer, 'auction': AuctionSummarySerializer}
 
-class BidSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bid
         fields = '__all__'
@@ -29,4 +150,26 @@ class BidSerializer(serializers.ModelSerializer):
 class BidCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bid
-        fields = ['amount']
\ No newline at end of file
+        fields = ['amount']
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'auction', 'kind', 'message', 'created_at']
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'min_price', 'max_price', 'currency', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_currency(self, value):
+        if value not in settings.CURRENCIES:
+            raise serializers.ValidationError(f'Supported currencies are {", ".join(settings.CURRENCIES)}.')
+        return value
+
+    def validate(self, data):
+        min_price, max_price = data.get('min_price'), data.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError({'max_price': 'Must not be below min_price.'})
+        return data
@@ -0,0 +1,59 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# What each process type imports before it can do its first piece of work
+PROCESSES = {
+    'web': ({}, 'from core.asgi import application\nfrom django.urls import get_resolver\nget_resolver().url_patterns'),
+    'worker': ({'CELERY_PROCESS': 'worker'}, 'from core.celery import app\napp.loader.import_default_modules()'),
+    'beat': ({'CELERY_PROCESS': 'beat'}, 'from core.celery import app\napp.loader.import_default_modules()'),
+}
+
+# importtime misses modules loaded with importlib.import_module, such as task
+# modules found by autodiscovery, so the process also lists sys.modules
+LIST_MODULES = '\nimport sys\nprint("\\n".join(sys.modules))'
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_import_times(output):
+    """{module: (self microseconds, cumulative microseconds)} from `python -X importtime` output"""
+    modules = {}
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+
+def profile(process):
+    """
+    Starts `process` up to the point it is ready in a fresh interpreter and
+    returns (wall seconds, import times per module, every loaded module)
+    """
+    env, code = PROCESSES[process]
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code + LIST_MODULES],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f'{process} failed to start:\n{result.stderr[-2000:]}')
+    return elapsed, parse_import_times(result.stderr), set(result.stdout.split())
+
+
+def by_package(modules):
+    """Self import time summed per top-level package, in microseconds"""
+    totals = {}
+    for module, (self_us, _) in modules.items():
+        package = module.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
@@ -1,41 +1,137 @@
+import logging
+from datetime import timedelta
+from smtplib import SMTPException
+
 from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
 from django.core.mail import send_mail
-from .models import Auction
-from datetime import datetime
+from django.db import OperationalError
+from django.db.models import F
+from django.utils import timezone
+from .models import Auction, BeatFence, SuspiciousBidder
+from .outbox import already_delivered, mark_delivered, prune_dispatched
+from .versions import bump_list_version
+from .notifications import build_notifications, deliver
+from .currency import fetch_rates, store_rates
+from .searches import match_auction
+
+logger = logging.getLogger(__name__)
+
+# Transient failures worth retrying with exponential backoff
+DATABASE_ERRORS = (OperationalError,)
+RETRY = {'retry_backoff': True, 'retry_backoff_max': 600, 'retry_jitter': True, 'max_retries': 5}
+
+def retry_with_backoff(task, exc):
+    """The manual form of the RETRY policy, for errors only known once a task runs"""
+    countdown = get_exponential_backoff_interval(
+        factor=1, retries=task.request.retries, maximum=RETRY['retry_backoff_max'], full_jitter=RETRY['retry_jitter'],
+    )
+    raise task.retry(exc=exc, countdown=countdown, max_retries=RETRY['max_retries'])
 
-@shared_task
-def check_ended_auctions():
-    now = datetime.now()
+# Closing is idempotent, so a sweep lost with its worker is simply run again
+@shared_task(acks_late=True, soft_time_limit=240, time_limit=300, autoretry_for=DATABASE_ERRORS, **RETRY)
+def check_ended_auctions(fencing_token=None):
+    # Sweeps from beat carry the leader's token; one from a deposed leader is dropped
+    if fencing_token is not None and not BeatFence.admit('check-ended-auctions', fencing_token):
+        logger.warning('Dropped closing sweep with stale fencing token %s', fencing_token)
+        return
+    now = timezone.now()
     ended_auctions = Auction.objects.filter(
         end_time__lte=now,
         is_active=True
     )
     
     for auction in ended_auctions:
-        send_auction_result_emails.delay(auction.id)
-        auction.is_active = False
-        auction.save()
+        auction.close()
 
-@shared_task
-def send_auction_result_emails(auction_id):
+@shared_task(bind=True, acks_late=True, soft_time_limit=60, time_limit=90)
+def send_auction_result_emails(self, auction_id):
+    # Imported here: anymail pulls in requests, which only mail tasks need
+    from anymail.exceptions import AnymailAPIError
+
+    if already_delivered(self):
+        return
     auction = Auction.objects.get(id=auction_id)
     winner = auction.highest_bidder
     
-    if(winner):
-        # Email to winner
+    try:
+        if(winner):
+            # Email to winner
+            send_mail(
+                'You won the auction!',
+                f'You won {auction.name} for ${auction.current_price}',
+                'noreply@yourapp.com',
+                [winner.email],
+                fail_silently=False,
+            )
+
+        # Email to creator
         send_mail(
-            'You won the auction!',
-            f'You won {auction.name} for ${auction.current_price}',
+            'Your auction ended',
+            f'Your auction {auction.name} sold for ${auction.current_price}',
             'noreply@yourapp.com',
-            [winner.email],
+            [auction.creator.email],
             fail_silently=False,
         )
-    
-    # Email to creator
-    send_mail(
-        'Your auction ended',
-        f'Your auction {auction.name} sold for ${auction.current_price}',
-        'noreply@yourapp.com',
-        [auction.creator.email],
-        fail_silently=False,
-    )
\ No newline at end of file
+    except (AnymailAPIError, SMTPException, ConnectionError) as exc:
+        retry_with_backoff(self, exc)
+    mark_delivered(self)
+
+@shared_task(soft_time_limit=600, time_limit=900)
+def prune_outbox():
+    return prune_dispatched()
+
+@shared_task(soft_time_limit=60, time_limit=90, autoretry_for=(OSError, ValueError), **RETRY)
+def refresh_exchange_rates():
+    return store_rates(fetch_rates())
+
+@shared_task(acks_late=True, soft_time_limit=120, time_limit=180)
+def generate_thumbnails(auction_id):
+    from .images import make_thumbnails  # Pillow is only needed here
+    auction = Auction.objects.only('id', 'image').get(id=auction_id)
+    if not auction.image:
+        return
+    thumbnails = make_thumbnails(auction.image, f'auctions/thumbnails/{auction.id}')
+    Auction.objects.filter(pk=auction.pk).update(thumbnails=thumbnails, version=F('version') + 1)
+    bump_list_version()
+
+@shared_task(bind=True, acks_late=True, soft_time_limit=120, time_limit=180, autoretry_for=DATABASE_ERRORS, **RETRY)
+def fan_out_notifications(self, auction_id, kind, since=None):
+    """Splits an auction's notifications into delivery batches spread over the workers"""
+    auction = Auction.objects.get(id=auction_id)
+    deliver_in_batches(self, auction_id, build_notifications(auction, kind, since))
+
+@shared_task(bind=True, acks_late=True, soft_time_limit=120, time_limit=180, autoretry_for=DATABASE_ERRORS, **RETRY)
+def match_saved_searches(self, auction_id):
+    """Notifies everyone whose saved searches match a newly created auction"""
+    auction = Auction.objects.get(id=auction_id)
+    deliver_in_batches(self, auction_id, match_auction(auction))
+
+@shared_task(soft_time_limit=30, time_limit=60, autoretry_for=DATABASE_ERRORS, **RETRY)
+def flag_suspicious_bidder(user_id, auction_id, score, reasons):
+    """Records a suspicious score, at most once per bidder per FRAUD_FLAG_COOLDOWN"""
+    since = timezone.now() - timedelta(seconds=settings.FRAUD_FLAG_COOLDOWN)
+    if SuspiciousBidder.objects.filter(user_id=user_id, created_at__gte=since).exists():
+        return False
+    SuspiciousBidder.objects.create(user_id=user_id, auction_id=auction_id, score=score, reasons=reasons)
+    return True
+
+def deliver_in_batches(task, auction_id, notifications):
+    """
+    Publishes one delivery task per batch. Batch task ids are derived from the
+    publishing task's id, which its retries keep, so batches a failed attempt
+    already delivered are skipped when the retry publishes them again.
+    """
+    size = settings.NOTIFICATION_BATCH_SIZE
+    for number, start in enumerate(range(0, len(notifications), size)):
+        task_id = f'{task.request.id}-{number}' if task.request.id else None
+        deliver_notifications.apply_async((auction_id, notifications[start:start + size]), task_id=task_id)
+
+@shared_task(bind=True, acks_late=True, soft_time_limit=120, time_limit=180)
+def deliver_notifications(self, auction_id, notifications):
+    # Not retried: a retry would store and push the whole batch a second time
+    if already_delivered(self):
+        return
+    deliver(auction_id, notifications)
+    mark_delivered(self)
@@ -7,7 +7,13 @@ urlpatterns = [
     path('login', views.login, name='login'),
     path('auctions/create', views.postAuction, name='auction-create'),
     path('auctions/', views.AuctionListView.as_view(), name='auction-list'),
+    path('auctions/ending-soon/', views.EndingSoonView.as_view(), name='auction-ending-soon'),
     path('auctions/<int:pk>/', views.AuctionDetailView.as_view(), name='auction-detail'),
     path('auctions/<int:pk>/bids/create/', views.postBid, name='bid-create'),
     path('auctions/<int:auction_id>/bids/', views.BidListView.as_view(), name='bid-list'),
+    path('auctions/<int:pk>/report/', views.auctionReport, name='auction-report'),
+    path('auctions/<int:pk>/watch/', views.watchAuction, name='auction-watch'),
+    path('notifications/', views.NotificationListView.as_view(), name='notification-list'),
+    path('searches/', views.SavedSearchListView.as_view(), name='saved-search-list'),
+    path('searches/<int:pk>/', views.SavedSearchDetailView.as_view(), name='saved-search-detail'),
 ]
\ No newline at end of file
@@ -0,0 +1,22 @@
+import time
+
+from django.core.cache import cache
+
+LIST_VERSION_KEY = 'auction-list-version'
+
+
+def list_version():
+    """Generation counter for auction listings, bumped whenever any auction changes"""
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost counter never repeats an old value
+        cache.add(LIST_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def bump_list_version():
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        cache.set(LIST_VERSION_KEY, time.time_ns(), None)
@@ -4,55 +4,197 @@ from rest_framework.decorators import api_view, authentication_classes, permissi
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status, generics, filters
+from rest_framework import status, generics
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .models import User, Auction, Bid
+from django.utils import timezone
+from django.views.decorators.http import etag
+from .models import User, Auction, Bid, AuctionEvent, Watch, Notification, SavedSearch
 from rest_framework.authtoken.models import Token
 
-from .serializers import UserSerializer, AuctionCreateSerializer, AuctionListSerializer, AuctionSerializer, BidSerializer, BidCreateSerializer
+from .serializers import UserSerializer, AuctionCreateSerializer, AuctionListSerializer, AuctionSerializer, BidSerializer, BidCreateSerializer, NotificationSerializer, SavedSearchSerializer
+
+from .filters import AuctionFilter, AuctionOrderingFilter
+from .currency import exchange_rates
+from .formats import SEALED_FORMATS, price_tick
+
+from .versions import list_version
+from .passwords import hash_password, verify_password, PasswordHashingBusy
 
-from .filters import AuctionFilter
+from core.routers import read_scope, allow_replica_reads, pin_to_primary, is_pinned_to_primary
+
+def hashingBusy():
+    return Response(
+        {'error': 'Too many sign-ins in progress, please retry'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': '1'}
+    )
 
 @api_view(['POST'])
 def signup(request):
     serializer = UserSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
-        user = User.objects.get(email=request.data['email'])
-        user.set_password(request.data['password'])
-        user.save()
-        token = Token.objects.create(user=user)
+        try:
+            password = hash_password(serializer.validated_data['password'])
+        except PasswordHashingBusy:
+            return hashingBusy()
+        # The user is inserted already hashed, together with its token
+        with transaction.atomic():
+            user = serializer.save(password=password)
+            token = Token.objects.create(user=user)
         return Response({'token': token.key, 'user': serializer.data})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 def login(request):
-    user = get_object_or_404(User, email=request.data['email'])
-    if not user.check_password(request.data['password']):
+    # Fetch the user's existing token in the same query
+    user = get_object_or_404(User.objects.select_related('auth_token'), email=request.data['email'])
+    try:
+        valid = verify_password(user, request.data['password'])
+    except PasswordHashingBusy:
+        return hashingBusy()
+    if not valid:
         return Response("missing user", status=status.HTTP_404_NOT_FOUND)
-    token, created = Token.objects.get_or_create(user=user)
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        token = Token.objects.create(user=user)
     serializer = UserSerializer(user)
     return Response({'token': token.key, 'user': serializer.data})
 
 @api_view(['POST'])
 @authentication_classes([SessionAuthentication, TokenAuthentication])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def postAuction(request):
     serializer = AuctionCreateSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save(creator=request.user)
+        auction = serializer.save(creator=request.user)
+        auction.schedule_thumbnails()
+        pin_to_primary(request.user)
         return Response({'auction': serializer.data})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class AuctionListView(generics.ListAPIView):
+# ETags are computed from version counters before the body is read, so a matching
+# If-None-Match is answered with 304 without querying or serializing auctions.
+# Dutch prices fall over time, so live prices add the current price tick.
+def auctionVersion(pk):
+    return Auction.objects.filter(pk=pk).values_list('version', 'format', 'is_active').first()
+
+def pathDigest(request):
+    return hashlib.sha1(request.get_full_path().encode()).hexdigest()[:16]
+
+def dutchAuctionsOpen(version):
+    # Cached per list version: opening or closing any auction bumps it
+    key = f'dutch-open:{version}'
+    found = cache.get(key)
+    if found is None:
+        found = Auction.objects.filter(format=Auction.DUTCH, is_active=True).exists()
+        cache.set(key, found)
+    return found
+
+def auctionListEtag(request):
+    version = list_version()
+    if dutchAuctionsOpen(version):
+        return f'auctions-{version}-{price_tick()}-{pathDigest(request)}'
+    return f'auctions-{version}-{pathDigest(request)}'
+
+def auctionDetailEtag(request, pk):
+    row = auctionVersion(pk)
+    if row is None:
+        return None
+    version, auction_format, is_active = row
+    if auction_format == Auction.DUTCH and is_active:
+        return f'auction-{pk}-{version}-{price_tick()}-{pathDigest(request)}'
+    return f'auction-{pk}-{version}-{pathDigest(request)}'
+
+def bidListEtag(request, auction_id):
+    row = auctionVersion(auction_id)
+    return None if row is None else f'bids-{auction_id}-{row[0]}-{pathDigest(request)}'
+
+class ReplicaReadMixin:
+    """
+    Serve a read-only view from a replica, unless the user wrote recently.
+    `etag_func` runs on the same database as the body, so a lagging replica
+    never serves an older body under a newer ETag.
+    """
+    etag_func = None
+    replica_max_lag = None  # Seconds behind the primary a replica may be, None for REPLICA_MAX_LAG
+    # The same authentication as the write endpoints, so a token client's
+    # read-your-writes pin is found
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_scope():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication runs against the primary
+        super().initial(request, *args, **kwargs)
+        allow_replica_reads(not is_pinned_to_primary(request.user), self.replica_max_lag)
+
+    def get(self, request, *args, **kwargs):
+        if self.etag_func is None:
+            return super().get(request, *args, **kwargs)
+
+        def read(request, *args, **kwargs):
+            return super(ReplicaReadMixin, self).get(request, *args, **kwargs)
+        return etag(self.etag_func)(read)(request, *args, **kwargs)
+
+class FieldSelectionMixin:
+    """
+    Honours ?fields=a,b and ?expand=relation: the serializer renders only
+    those fields and the queryset loads only the columns they read, joining
+    expanded relations in the same query
+    """
+    projection_columns = ()  # Loaded whatever the fields, e.g. for cursor pagination
+
+    def field_selection(self):
+        if not hasattr(self, '_field_selection'):
+            params = self.request.query_params
+            self._field_selection = self.get_serializer_class().select(params.get('fields'), params.get('expand'))
+        return self._field_selection
+
+    def filter_queryset(self, queryset):
+        fields, expand = self.field_selection()
+        return self.get_serializer_class().project(super().filter_queryset(queryset), fields, expand, self.projection_columns)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.field_selection()
+        return context
+
+class DisplayCurrencyMixin:
+    """
+    Adds display prices in the `currency` query parameter, converted with
+    rates loaded once per request
+    """
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        currency = self.request.query_params.get('currency')
+        if currency in settings.CURRENCIES:
+            context['display_currency'] = currency
+            context['rates'] = exchange_rates()
+        return context
+
+class AuctionListView(ReplicaReadMixin, FieldSelectionMixin, DisplayCurrencyMixin, generics.ListAPIView):
     """
     GET: List all auctions with filtering, ordering, and pagination
     """
+    etag_func = staticmethod(auctionListEtag)
+    replica_max_lag = 0  # The list version is the primary's, so only a caught-up replica matches it
     queryset = Auction.objects.all()
     serializer_class = AuctionListSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, AuctionOrderingFilter]
     filterset_class = AuctionFilter
     ordering_fields = ['created_at', 'current_price']
     ordering = ['-created_at']  # Default ordering
@@ -61,62 +203,176 @@ class AuctionListView(generics.ListAPIView):
         queryset = super().get_queryset()
         return queryset
     
-class AuctionDetailView(generics.RetrieveAPIView):
+class EndingSoonPagination(CursorPagination):
+    ordering = ('end_time', 'id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+class EndingSoonView(ReplicaReadMixin, FieldSelectionMixin, DisplayCurrencyMixin, generics.ListAPIView):
+    """
+    GET: Open auctions ending within `within` seconds, soonest first, cursor paginated.
+    Served by a range scan of the partial index on open auctions' end_time.
+    """
+    etag_func = staticmethod(auctionListEtag)
+    replica_max_lag = 0  # As AuctionListView, it shares the list version
+    serializer_class = AuctionListSerializer
+    pagination_class = EndingSoonPagination
+    projection_columns = EndingSoonPagination.ordering
+
+    def get_queryset(self):
+        try:
+            within = int(self.request.query_params.get('within', settings.ENDING_SOON_DEFAULT_WINDOW))
+        except ValueError:
+            raise ValidationError({'within': 'Must be a number of seconds.'})
+        if not 0 < within <= settings.ENDING_SOON_MAX_WINDOW:
+            raise ValidationError({'within': f'Must be between 1 and {settings.ENDING_SOON_MAX_WINDOW} seconds.'})
+        now = timezone.now()
+        return Auction.objects.filter(
+            is_active=True,
+            end_time__gt=now,
+            end_time__lte=now + timedelta(seconds=within),
+        )
+
+class AuctionDetailView(ReplicaReadMixin, FieldSelectionMixin, generics.RetrieveAPIView):
     """
     GET: Retrieve a single auction's details
     """
+    etag_func = staticmethod(auctionDetailEtag)
     queryset = Auction.objects.all()
     serializer_class = AuctionSerializer
 
-class BidListView(generics.ListAPIView):
+class BidListView(ReplicaReadMixin, FieldSelectionMixin, generics.ListAPIView):
     """
     GET: List all auctions with filtering, ordering, and pagination
     """
+    etag_func = staticmethod(bidListEtag)
     serializer_class = BidSerializer
     ordering_fields = ['created_at', 'amount']
     ordering = ['-created_at']  # Default ordering
 
     def get_queryset(self):
         auction_id = self.kwargs['auction_id']
-        return Bid.objects.filter(auction_id=auction_id)
+        # Sealed bids stay hidden until the auction closes
+        return Bid.objects.filter(auction_id=auction_id).exclude(
+            auction__is_active=True, auction__format__in=SEALED_FORMATS
+        )
 
 @api_view(['POST'])
 @authentication_classes([SessionAuthentication, TokenAuthentication])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def postBid(request, pk):
     auction = get_object_or_404(Auction, pk=pk)
+    auction_format = auction.get_format()
     serializer = BidCreateSerializer(data=request.data)
     if serializer.is_valid():
         bid_amount = serializer.validated_data['amount']
+
+        if auction_format.locks_auction:
+            # Lock the auction row so concurrent bids are checked against the latest price
+            auction = Auction.objects.select_for_update().get(pk=pk)
         
         # Check if auction is active
         if not auction.is_active:
-            return Response(
-                {'error': 'This auction is no longer active'},
-                status=status.HTTP_400_BAD_REQUEST
+            return rejectBid(
+                auction, request.user, bid_amount,
+                'This auction is no longer active',
+                status.HTTP_400_BAD_REQUEST
             )
             
-        # Check if bid is higher than current price
-        if bid_amount <= auction.current_price:
-            return Response(
-                {'error': f'Bid must be higher than current price (${auction.current_price})'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # Check the bid against the auction's format
+        error = auction_format.validate_bid(auction, bid_amount)
+        if error:
+            return rejectBid(auction, request.user, bid_amount, error, status.HTTP_400_BAD_REQUEST)
             
         # Check if user is not the auction creator
         if request.user == auction.creator:
-            return Response(
-                {'error': 'You cannot bid on your own auction'},
-                status=status.HTTP_403_FORBIDDEN
+            return rejectBid(
+                auction, request.user, bid_amount,
+                'You cannot bid on your own auction',
+                status.HTTP_403_FORBIDDEN
             )
             
-        # Save the valid bid
-        bid = serializer.save(user=request.user, auction=auction)
-            
-        # Update auction current price
-        auction.current_price = bid_amount
-        auction.save()
+        # Save the valid bid, the format updates the auction
+        serializer.save(user=request.user, auction=auction, amount=auction_format.clearing_amount(auction, bid_amount))
+        pin_to_primary(request.user)
             
         return Response({'bid': serializer.data}, status=status.HTTP_201_CREATED)    
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST', 'DELETE'])
+@authentication_classes([SessionAuthentication, TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchAuction(request, pk):
+    auction = get_object_or_404(Auction, pk=pk)
+    if request.method == 'DELETE':
+        Watch.objects.filter(auction=auction, user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    Watch.objects.get_or_create(auction=auction, user=request.user)
+    return Response({'watching': auction.id}, status=status.HTTP_201_CREATED)
+
+class NotificationListView(generics.ListAPIView):
+    """
+    GET: List the signed-in user's notifications, newest first
+    """
+    serializer_class = NotificationSerializer
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
+class SavedSearchListView(generics.ListCreateAPIView):
+    """
+    GET: List the signed-in user's saved searches
+    POST: Save a search; new auctions matching it arrive as notifications
+    """
+    serializer_class = SavedSearchSerializer
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        if self.get_queryset().count() >= settings.MAX_SAVED_SEARCHES:
+            raise ValidationError({'error': f'At most {settings.MAX_SAVED_SEARCHES} saved searches per user.'})
+        serializer.save(user=self.request.user)
+
+class SavedSearchDetailView(generics.DestroyAPIView):
+    """
+    DELETE: Remove one of the signed-in user's saved searches
+    """
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+@api_view(['GET'])
+@authentication_classes([SessionAuthentication, TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def auctionReport(request, pk):
+    auction = get_object_or_404(Auction, pk=pk)
+
+    if request.user != auction.creator:
+        return Response(
+            {'error': 'Only the seller can view this report'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    if auction.get_format().hides_bids and auction.is_active:
+        return Response(
+            {'error': 'Reports for sealed-bid auctions are available once they close'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    from .analytics import auction_report  # NumPy is only loaded by processes that serve reports
+    return Response(auction_report(auction))
+
+def rejectBid(auction, user, amount, error, status_code):
+    """Record the rejected bid in the auction's event log and build the error response"""
+    AuctionEvent.record(auction, AuctionEvent.BID_REJECTED, user=user, amount=amount, reason=error)
+    return Response({'error': error}, status=status_code)
@@ -2,6 +2,11 @@ import os
 from celery import Celery
  
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Django's system checks import every URLconf, view and serializer; workers
+# and beat never serve requests, and the web deploy already runs the checks
+os.environ.setdefault('CELERY_SKIP_CHECKS', 'true')
 app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+# Beat publishes scheduled tasks by name, so only workers import the task modules
+if os.environ.get('CELERY_PROCESS') != 'beat':
+    app.autodiscover_tasks()
\ No newline at end of file
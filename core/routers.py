@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+# Reads go to the primary unless a read-only view opts in for the current
+# request: False, True once allowed, then the alias the scope settled on.
+_replica_reads = ContextVar('replica_reads', default=False)
+# Most lag the scope accepts, None for REPLICA_MAX_LAG
+_max_lag = ContextVar('replica_max_lag', default=None)
+
+# alias -> (checked_at, lag in seconds or None when the replica is unreachable)
+_lag_checks = {}
+# alias -> lock held by the one request probing that replica
+_probe_locks = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@contextmanager
+def read_scope():
+    """Scope replica selection to a block; reads start on the primary"""
+    token, lag_token = _replica_reads.set(False), _max_lag.set(None)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+        _max_lag.reset(lag_token)
+
+
+def allow_replica_reads(allowed=True, max_lag=None):
+    """Let reads in the current scope go to a replica at most `max_lag` seconds behind"""
+    _replica_reads.set(allowed)
+    _max_lag.set(max_lag)
+
+
+def pin_to_primary(user):
+    """Send the user's reads to the primary for a short window after a write"""
+    if settings.DATABASE_REPLICAS and user.is_authenticated:
+        cache.set(f'primary-pin:{user.pk}', True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    if not settings.DATABASE_REPLICAS or not user.is_authenticated:
+        return False
+    return bool(cache.get(f'primary-pin:{user.pk}'))
+
+
+def _probe(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_lag(alias):
+    """
+    Returns the replica's replay lag in seconds, None if it can't be reached.
+    Probes run on the request path, so a replica that failed one is left down
+    for REPLICA_DOWN_BACKOFF seconds, and only one request at a time probes
+    while the others use the last result.
+    """
+    now = time.monotonic()
+    checked_at, lag = _lag_checks.get(alias, (None, None))
+    if checked_at is not None:
+        valid_for = settings.REPLICA_LAG_CHECK_INTERVAL if lag is not None else settings.REPLICA_DOWN_BACKOFF
+        if now - checked_at < valid_for:
+            return lag
+
+    lock = _probe_locks.setdefault(alias, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return lag
+    try:
+        try:
+            lag = _probe(alias)
+        except DatabaseError:
+            lag = None
+        _lag_checks[alias] = (time.monotonic(), lag)
+    finally:
+        lock.release()
+    return lag
+
+
+def healthy_replicas(max_lag=None):
+    max_lag = settings.REPLICA_MAX_LAG if max_lag is None else max_lag
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            replicas.append(alias)
+    return replicas
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary. Reads go to a healthy replica only inside
+    a scope that allowed it, the same one for the whole scope, and fall back
+    to the primary when every replica is lagging or down.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica_reads.get()
+        if not alias:
+            return 'default'
+        if alias is True:
+            # One database per scope: a replica only moves forward, so nothing
+            # a request reads later is older than what it read before
+            replicas = healthy_replicas(_max_lag.get())
+            alias = random.choice(replicas) if replicas else 'default'
+            _replica_reads.set(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from celery.schedules import crontab
+from kombu import Queue
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv() 
@@ -46,7 +48,6 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'django_filters',
     'auctionEngine',
-    'anymail',
 ]
 
 MIDDLEWARE = [
@@ -83,6 +84,11 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections come from a psycopg pool, sized per process type through the
+# environment (see docker-compose.yml). With DB_POOL=false Django keeps
+# persistent connections for DB_CONN_MAX_AGE seconds instead.
+DB_POOL = os.getenv('DB_POOL', 'true').lower() == 'true'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -91,10 +97,79 @@ DATABASES = {
         'PASSWORD': 'postgres',
         'HOST': 'db',
         'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+}
+
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),  # seconds before idle connections are closed
+        'check': ConnectionPool.check_connection,  # health check on checkout
+    }
+
+# Read replicas, e.g. DATABASE_REPLICA_HOSTS="replica1,replica2". Each host gets a
+# replica_<n> alias; in tests the replicas mirror the default database. Replica
+# connections give up after REPLICA_CONNECT_TIMEOUT seconds, since reads can
+# fall back to the primary.
+REPLICA_CONNECT_TIMEOUT = int(os.getenv('REPLICA_CONNECT_TIMEOUT', 2))
+
+for index, host in enumerate(filter(None, os.getenv('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    options = {**DATABASES['default']['OPTIONS'], 'connect_timeout': REPLICA_CONNECT_TIMEOUT}
+    if 'pool' in options:
+        options['pool'] = {**options['pool'], 'timeout': REPLICA_CONNECT_TIMEOUT}
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': options,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 5))  # seconds
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 2))  # seconds
+REPLICA_DOWN_BACKOFF = float(os.getenv('REPLICA_DOWN_BACKOFF', 30))  # seconds an unreachable replica is skipped
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))  # read-your-writes window after a bid
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://redis:6379/1',
     }
 }
 
 
+# Test settings (cheap hashing, eager Celery) apply under `manage.py test` and
+# pytest; other runners set DJANGO_TESTING=true
+TESTING = os.getenv('DJANGO_TESTING', '').lower() == 'true' or sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Password hashing
+# PBKDF2 work factor, kept cheap under the test runner. Hashing runs on a bounded
+# pool of PASSWORD_HASH_WORKERS threads with PASSWORD_HASH_QUEUE waiting callers.
+
+PASSWORD_HASHERS = [
+    'auctionEngine.passwords.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 1000 if TESTING else 870000))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))  # seconds to wait for a slot
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -131,15 +206,92 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files. Point STORAGES['default'] at an object storage backend to
+# move them off the app servers; thumbnails are written through the same storage.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Stream uploads to a temporary file in chunks instead of holding them in memory
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+DUTCH_PRICE_TICK = 10  # seconds between Dutch auction price steps
+
+# Prices are stored in the auction's currency and, for filtering and sorting,
+# in BASE_CURRENCY using rates refreshed from EXCHANGE_RATES_URL
+BASE_CURRENCY = 'USD'
+CURRENCIES = ['USD', 'EUR', 'GBP', 'CHF', 'RSD']
+EXCHANGE_RATES_URL = os.getenv('EXCHANGE_RATES_URL', 'https://open.er-api.com/v6/latest/{base}')
+
+MAX_SAVED_SEARCHES = 20  # per user
+
+FRAUD_SCORE_THRESHOLD = float(os.getenv('FRAUD_SCORE_THRESHOLD', 0.75))  # bid scores at or above this flag the bidder
+FRAUD_STATE_TTL = 7 * 24 * 60 * 60  # seconds a bidder's scoring state outlives their last bid
+FRAUD_FLAG_COOLDOWN = 24 * 60 * 60  # seconds before the same bidder is flagged again
+FRAUD_COMMIT_LAG = 10  # seconds a bid event may take to commit before the monitor moves past it
+
+ENDING_SOON_DEFAULT_WINDOW = 24 * 60 * 60  # seconds ahead the ending-soon list looks by default
+ENDING_SOON_MAX_WINDOW = 7 * 24 * 60 * 60
+
+NOTIFICATION_COALESCE_SECONDS = 60  # bids on an auction within this window share one notification
+NOTIFICATION_BATCH_SIZE = 500  # recipients per delivery task
+ENDING_SOON_NOTICE = 15 * 60  # seconds before end_time watchers are reminded
+
+AUCTION_THUMBNAIL_SIZES = [160, 480, 960]  # longest edge in pixels
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+ASGI_APPLICATION = 'core.asgi.application'
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [('redis', 6379)],
+        },
+    },
+}
+
 CELERY_BROKER_URL = "redis://redis:6379"
 CELERY_RESULT_BACKEND = "redis://redis:6379"
 CELERY_TIMEZONE = "Europe/Belgrade"
 
+# Closing sweeps, user-facing notifications and housekeeping run on separate
+# queues so a slow mail provider can't hold up auction closes. Each queue gets
+# its own worker service with its own concurrency (see docker-compose.yml).
+CELERY_TASK_QUEUES = [
+    Queue('closing'),
+    Queue('notifications'),
+    Queue('maintenance'),
+]
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_ROUTES = {
+    'auctionEngine.tasks.check_ended_auctions': {'queue': 'closing'},
+    'auctionEngine.tasks.send_auction_result_emails': {'queue': 'notifications'},
+    'auctionEngine.tasks.fan_out_notifications': {'queue': 'notifications'},
+    'auctionEngine.tasks.deliver_notifications': {'queue': 'notifications'},
+    'auctionEngine.tasks.match_saved_searches': {'queue': 'notifications'},
+    'auctionEngine.tasks.prune_outbox': {'queue': 'maintenance'},
+    'auctionEngine.tasks.generate_thumbnails': {'queue': 'maintenance'},
+    'auctionEngine.tasks.refresh_exchange_rates': {'queue': 'maintenance'},
+    'auctionEngine.tasks.flag_suspicious_bidder': {'queue': 'maintenance'},
+}
+# One reserved message per worker process, so a long task never sits on
+# messages another idle worker could run
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_PREFETCH_MULTIPLIER', 1))
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+# Unacknowledged (acks_late) messages are redelivered after this many seconds;
+# it must exceed the longest task time limit
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 60 * 60}
+
+if TESTING:
+    # Tests run tasks inline and publish to an in-memory broker, never a real one
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_BROKER_URL = 'memory://'
+    CELERY_RESULT_BACKEND = 'cache+memory://'
+
 AUTH_USER_MODEL = 'auctionEngine.User'
 
 REST_FRAMEWORK = {
@@ -157,9 +309,24 @@ BREVO_API_URL = "https://api.brevo.com/v3/"
 
 DEFAULT_FROM_EMAIL = "noreply@yourapp.com"
 
+# Several beat replicas may run; the one holding a lease in the database sends
+# the schedule, and a standby takes over within BEAT_LEADER_TTL seconds of
+# the leader going quiet. Fenced tasks get the leader's fencing token.
+CELERY_BEAT_SCHEDULER = 'auctionEngine.beat:LeaderScheduler'
+BEAT_LEADER_TTL = int(os.getenv('BEAT_LEADER_TTL', 10))
+BEAT_FENCED_TASKS = {'auctionEngine.tasks.check_ended_auctions'}
+
 CELERY_BEAT_SCHEDULE = {
     'check-ended-auctions': {
         'task': 'auctionEngine.tasks.check_ended_auctions',
         'schedule': crontab(minute='*/5'),  # Every 5 minutes
     },
+    'refresh-exchange-rates': {
+        'task': 'auctionEngine.tasks.refresh_exchange_rates',
+        'schedule': crontab(minute=0),  # Hourly
+    },
+    'prune-outbox': {
+        'task': 'auctionEngine.tasks.prune_outbox',
+        'schedule': crontab(hour=3, minute=0),  # Daily
+    },
 }